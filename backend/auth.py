@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import STAGE_LATENCY
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSUnavailableError(Exception):
+    """Raised when no signing keys could be fetched and none are cached."""
+
+
+class JWKSProvider:
+    """
+    Async JWKS provider with a pooled HTTP client.
+
+    - Concurrent refreshes collapse into a single in-flight fetch.
+    - Keys are refreshed in the background shortly before they expire and the
+      stale set keeps being served while the refresh runs.
+    - Refetches triggered by an unknown ``kid`` are rate limited per kid, and
+      to ``max_unknown_kids`` distinct kids per ``unknown_kid_interval``, so
+      junk tokens cannot cause a fetch storm against the auth server. A key
+      set fetched longer ago than that is always refetched for a new kid, so
+      junk kids never hold back the refresh a real rotation needs.
+    - After a failed fetch no other is started for ``unknown_kid_interval``
+      seconds: requests keep the cached keys or fail fast meanwhile instead of
+      each waiting on an auth server that is down.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float = 600.0,
+        refresh_ahead: float = 60.0,
+        max_stale: float = 3600.0,
+        unknown_kid_interval: float = 30.0,
+        max_unknown_kids: int = 16,
+        timeout: float = 5.0,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_stale = max_stale
+        self.unknown_kid_interval = unknown_kid_interval
+        self.max_unknown_kids = max_unknown_kids
+        self.timeout = timeout
+
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._public_keys: Dict[str, Any] = {}
+        self._rotation_listeners: List[Callable[[], None]] = []
+        self._fetched_at: float = 0.0
+        # Unknown kids that forced a refetch, oldest first
+        self._unknown_kids: "OrderedDict[str, float]" = OrderedDict()
+        self._failed_at: float = float("-inf")
+        self._last_error: str = ""
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            # Loaded with the first fetch, so a startup without JWKS prefetch does not import it
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Cancel any pending refresh and close the HTTP client"""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _fetch(self):
+        try:
+            with STAGE_LATENCY.time("jwks_fetch"):
+                resp = await self._get_client().get(self.url)
+            resp.raise_for_status()
+            keys = resp.json().get("keys", [])
+        except Exception as e:
+            self._failed_at = time.monotonic()
+            self._last_error = str(e) or type(e).__name__
+            raise
+        new_keys = {key["kid"]: key for key in keys if key.get("kid")}
+        self._fetched_at = time.monotonic()
+        if new_keys == self._keys:
+            return
+        rotated = bool(self._keys)
+        self._keys = new_keys
+        self._public_keys = {}
+        if rotated:
+            for listener in self._rotation_listeners:
+                listener()
+
+    def add_rotation_listener(self, listener: Callable[[], None]):
+        """Register a callback invoked whenever a refresh changes the key set"""
+        self._rotation_listeners.append(listener)
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Start a refresh unless one is already in flight (single-flight)"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._fetch())
+            self._refresh_task.add_done_callback(self._log_refresh_failure)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("JWKS refresh failed: %s", task.exception())
+
+    async def refresh(self):
+        """Refresh the key set, joining an in-flight fetch if there is one"""
+        # Shield so a cancelled request does not cancel the shared fetch
+        await asyncio.shield(self._start_refresh())
+
+    async def get_key(self, kid: str) -> Optional[Dict[str, Any]]:
+        """Return the JWK for ``kid``, or None if the auth server does not know it"""
+        now = time.monotonic()
+        age = now - self._fetched_at
+        # A fetch failed recently: keep what is cached rather than retrying per request
+        backing_off = now - self._failed_at < self.unknown_kid_interval
+
+        if not self._keys or age >= self.max_stale:
+            if backing_off:
+                if not self._keys:
+                    raise JWKSUnavailableError(f"last fetch failed: {self._last_error}")
+            else:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    if not self._keys:
+                        raise JWKSUnavailableError(str(e)) from e
+        elif age >= self.ttl - self.refresh_ahead and not backing_off:
+            # Stale-while-revalidate: serve the current keys, refresh behind
+            self._start_refresh()
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid: the keys may have rotated, but only refetch so often
+        now = time.monotonic()
+        if backing_off or not self._may_refresh_for(kid, now):
+            return None
+        self._unknown_kids[kid] = now
+        self._unknown_kids.move_to_end(kid)
+        while len(self._unknown_kids) > self.max_unknown_kids:
+            self._unknown_kids.popitem(last=False)
+        try:
+            await self.refresh()
+        except Exception:
+            return None
+        return self._keys.get(kid)
+
+    def _may_refresh_for(self, kid: str, now: float) -> bool:
+        if now - self._fetched_at >= self.unknown_kid_interval:
+            return True
+        unknown_kids = self._unknown_kids
+        while unknown_kids and now - next(iter(unknown_kids.values())) >= self.unknown_kid_interval:
+            unknown_kids.popitem(last=False)
+        return kid not in unknown_kids and len(unknown_kids) < self.max_unknown_kids
+
+    async def get_public_key(self, kid: str) -> Optional[Any]:
+        """Return the parsed public key for ``kid``, constructed once per key set"""
+        key = await self.get_key(kid)
+        if key is None:
+            return None
+        public_key = self._public_keys.get(kid)
+        if public_key is None:
+            # jose pulls in the cryptography backends; load them on first use, not at import
+            from jose import jwk
+            public_key = jwk.construct(key, key.get("alg", "RS256"))
+            self._public_keys[kid] = public_key
+        return public_key
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of verified JWT payloads keyed by a SHA-256 digest of
+    the raw token. Entries expire at the token's ``exp`` claim (capped by
+    ``max_ttl``) so a cached payload is never served for an expired token.
+    """
+
+    def __init__(self, max_size: int = 10000, max_ttl: float = 300.0):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        digest = self._digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        payload, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[digest]
+            return None
+        self._entries.move_to_end(digest)
+        return payload
+
+    def put(self, token: str, payload: Dict[str, Any]):
+        expires_at = time.time() + self.max_ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        digest = self._digest(token)
+        self._entries[digest] = (payload, expires_at)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,62 @@
+"""
+Microbenchmark of require_auth overhead per request, with and without the
+verified-token cache.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_auth [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import main
+from benchmarks.keys import LocalSigner
+
+
+class _FakeRequest:
+    def __init__(self, token: str):
+        self.headers = {"authorization": f"Bearer {token}"}
+        self.state = type("State", (), {})()
+
+
+async def _measure(token: str, requests: int, use_cache: bool) -> float:
+    main.token_cache.clear()
+    request = _FakeRequest(token)
+    # Warm up the JWKS and parsed-key caches so only verification is measured
+    await main.require_auth(request)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        if not use_cache:
+            main.token_cache.clear()
+        await main.require_auth(request)
+    return (time.perf_counter() - start) / requests
+
+
+async def run(requests: int):
+    signer = LocalSigner()
+    jwks = signer.jwks()
+    main.jwks_provider._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json=jwks))
+    )
+    token = signer.token()
+
+    uncached = await _measure(token, requests, use_cache=False)
+    cached = await _measure(token, requests, use_cache=True)
+    await main.jwks_provider.aclose()
+
+    print(f"requests per run:      {requests}")
+    print(f"without token cache:   {uncached * 1e6:10.1f} us/request")
+    print(f"with token cache:      {cached * 1e6:10.1f} us/request")
+    print(f"speedup:               {uncached / cached:10.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
@@ -0,0 +1,300 @@
+"""
+Load benchmark of /chat, /chat/stream, /problem/current and /problems.
+
+Runs the app in-process over httpx's ASGI transport and/or as a real uvicorn
+server, with locally signed tokens, a stub JWKS endpoint and a stub
+OpenAI-compatible SSE server. Reports latency percentiles, requests per
+second and time to first byte, and can save the results as a baseline and
+compare a later run against it.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_endpoints --save baseline.json
+    python -m benchmarks.bench_endpoints --compare baseline.json
+
+The ASGI transport buffers response bodies, so in-process TTFB equals total
+latency; use ``--target uvicorn`` for meaningful streaming TTFB.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.keys import LocalSigner
+from benchmarks.stubs import StubServer, free_port, stub_app
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOLUTION = "Identify the root cause by analyzing user feedback and usage data, attempt"
+
+# name -> (method, path, request body factory taking a sequence number)
+SCENARIOS: Dict[str, Tuple[str, str, Optional[Callable[[int], Dict[str, Any]]]]] = {
+    "chat": ("POST", "/chat", lambda i: {"user_input": f"{SOLUTION} {i}"}),
+    "chat_stream": ("POST", "/chat/stream", lambda i: {"user_input": f"{SOLUTION} {i}"}),
+    "problem_current": ("GET", "/problem/current", None),
+    "problems": ("GET", "/problems?limit=50", None),
+}
+
+# Compared against the baseline; a higher value is a regression for all but rps
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "ttfb_p50_ms", "rps")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], ttfbs: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    latencies, ttfbs = sorted(latencies), sorted(ttfbs)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "ttfb_p50_ms": ms(percentile(ttfbs, 50)),
+        "ttfb_p95_ms": ms(percentile(ttfbs, 95)),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    tokens: List[str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Dict[str, float]:
+    method, path, body = SCENARIOS[name]
+    sequence = itertools.count()
+    token_cycle = itertools.cycle(tokens)
+    latencies: List[float] = []
+    ttfbs: List[float] = []
+    errors = 0
+
+    async def one(record: bool):
+        nonlocal errors
+        i = next(sequence)
+        headers = {"Authorization": f"Bearer {next(token_cycle)}"}
+        started = time.perf_counter()
+        ttfb = None
+        try:
+            async with client.stream(method, path, json=body(i) if body else None, headers=headers) as response:
+                async for _ in response.aiter_raw():
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - started
+                ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        if not record:
+            return
+        if ok:
+            latencies.append(time.perf_counter() - started)
+            ttfbs.append(ttfb if ttfb is not None else latencies[-1])
+        else:
+            errors += 1
+
+    async def worker(count: int, record: bool):
+        for _ in range(count):
+            await one(record)
+
+    async def drive(total: int, record: bool):
+        workers = min(concurrency, total)
+        shares = [total // workers + (1 if w < total % workers else 0) for w in range(workers)]
+        await asyncio.gather(*(worker(share, record) for share in shares))
+
+    if warmup:
+        await drive(warmup, record=False)
+    started = time.perf_counter()
+    await drive(requests, record=True)
+    return summarize(latencies, ttfbs, errors, time.perf_counter() - started)
+
+
+def app_environment(stub_url: str, evaluation_mode: str, workdir: str) -> Dict[str, str]:
+    return {
+        "JWKS_URL": f"{stub_url}/certs",
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_API_URL": f"{stub_url}/v1/chat/completions",
+        "EVALUATION_MODE": evaluation_mode,
+        "SUBMISSION_LOG_ENABLED": "1",
+        "SUBMISSION_LOG_PATH": os.path.join(workdir, "submissions.jsonl"),
+        "PROBLEM_STATE_PATH": os.path.join(workdir, "problem_state.db"),
+        # The load generator is a handful of users far above any sensible per-user rate
+        "RATE_LIMIT_ENABLED": "0",
+        # Scenarios reuse the same inputs; cached replays would make each result depend on the ones before it
+        "LLM_CACHE_ENABLED": "0",
+    }
+
+
+async def run_inprocess(args, tokens: List[str]) -> Dict[str, Dict[str, float]]:
+    # Imported late so the environment set up by main() is picked up
+    import main
+
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name in args.scenarios:
+                results[name] = await run_scenario(client, name, tokens, args.requests, args.concurrency, args.warmup)
+    return results
+
+
+async def run_uvicorn(args, tokens: List[str], env: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+    port = free_port()
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **env})
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    await client.get("/problem/current")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("uvicorn did not start")
+                    await asyncio.sleep(0.1)
+            results = {}
+            for name in args.scenarios:
+                results[name] = await run_scenario(client, name, tokens, args.requests, args.concurrency, args.warmup)
+            return results
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, Dict[str, Dict[str, float]]]):
+    header = f"{'target':<10} {'scenario':<16} {'reqs':>6} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttfb50':>9} {'ttfb95':>9}"
+    print(header)
+    print("-" * len(header))
+    for target, scenarios in results.items():
+        for name, r in scenarios.items():
+            print(
+                f"{target:<10} {name:<16} {r['requests']:>6} {r['errors']:>5} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} "
+                f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['ttfb_p50_ms']:>9.2f} {r['ttfb_p95_ms']:>9.2f}"
+            )
+
+
+def compare(
+    baseline: Dict[str, Any],
+    results: Dict[str, Dict[str, Dict[str, float]]],
+    threshold: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """
+    Print the change of every compared metric and return the regressions
+    beyond ``threshold``. Latency changes smaller than ``min_delta_ms`` are
+    treated as noise.
+    """
+    regressions = []
+    print(f"\nCompared with baseline from commit {baseline['meta'].get('commit')}:")
+    for target, scenarios in results.items():
+        for name, current in scenarios.items():
+            previous = baseline["results"].get(target, {}).get(name)
+            if previous is None:
+                continue
+            changes = []
+            for metric in COMPARED_METRICS:
+                before, after = previous.get(metric), current.get(metric)
+                if not before:
+                    continue
+                change = (after - before) / before
+                changes.append(f"{metric} {change:+.1%}")
+                worse = -change if metric == "rps" else change
+                if metric != "rps" and after - before < min_delta_ms:
+                    continue
+                if worse > threshold:
+                    regressions.append(f"{target}/{name} {metric}: {before} -> {after}")
+            print(f"  {target:<10} {name:<16} " + ", ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", choices=("inprocess", "uvicorn", "both"), default="both")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=50, help="distinct signed tokens to rotate through")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--evaluation-mode", choices=("keyword", "llm"), default="llm")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="stub LLM tokens per second")
+    parser.add_argument("--tokens", type=int, default=50, help="stub LLM tokens per response")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore smaller latency increases")
+    args = parser.parse_args()
+
+    signer = LocalSigner()
+    tokens = [signer.token(sub=f"bench-user-{i}") for i in range(args.users)]
+    app = stub_app(signer.jwks(), latency=args.llm_latency, token_rate=args.token_rate, tokens=args.tokens)
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with StubServer(app) as stub, tempfile.TemporaryDirectory() as workdir:
+        env = app_environment(stub.url, args.evaluation_mode, workdir)
+        if args.target in ("inprocess", "both"):
+            os.environ.update(env)
+            results["inprocess"] = asyncio.run(run_inprocess(args, tokens))
+        if args.target in ("uvicorn", "both"):
+            results["uvicorn"] = asyncio.run(run_uvicorn(args, tokens, env))
+
+    print_results(results)
+
+    if args.save:
+        meta = {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold, args.min_delta_ms)
+        if regressions:
+            print("\nRegressions beyond {:.0%}:".format(args.threshold))
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
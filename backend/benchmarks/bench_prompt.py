@@ -0,0 +1,82 @@
+"""
+Benchmark of per-request LLM payload construction.
+
+Compares rebuilding the evaluation context, the message list and the JSON
+body on every request (plus hashing the whole context for the response cache
+key) with splicing the user message onto a pre-compiled prompt prefix from
+``EvaluationContextCache``. Both variants must produce the same request.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_prompt [--runs 20000] [--summary]
+"""
+
+import argparse
+import json
+import time
+
+from config import get_context, get_context_digest
+from llm.cache import cache_key
+from llm.prompt import build_payload
+from problem_manager import ProblemManager
+from prompts import EvaluationContextCache, build_evaluation_context
+
+MODEL = "gpt-4o-mini"
+USER_INPUT = "I would first check the logs of the failing service and compare them with the last deploy."
+
+
+def legacy(problem, ai_flow_config, summary):
+    """The former path: build the context, walk its roles and json.dumps a payload dict"""
+    context = build_evaluation_context(get_context(), problem, ai_flow_config, summary)
+    context.pop("prompt")
+    key = cache_key(context, USER_INPUT, 0.3, 512)
+    messages = []
+    for role in context.get("roles", []):
+        for k, v in role.items():
+            if k in ("system", "assistant"):
+                messages.append({"role": k, "content": v})
+    messages.append({"role": "user", "content": USER_INPUT})
+    payload = {"model": MODEL, "messages": messages, "temperature": 0.3, "max_tokens": 512, "stream": True}
+    payload["stream_options"] = {"include_usage": True}
+    return key, json.dumps(payload).encode()
+
+
+def compiled(cache, problem, ai_flow_config, summary):
+    context = cache.get(get_context(), get_context_digest(), problem, ai_flow_config, summary)
+    key = cache_key(context, USER_INPUT, 0.3, 512)
+    return key, build_payload(context["prompt"], USER_INPUT, MODEL, 0.3, 512, True)
+
+
+def measure(name, build, runs):
+    build()
+    started = time.perf_counter()
+    for _ in range(runs):
+        build()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<34} {elapsed / runs * 1e6:9.2f} us/request")
+    return elapsed
+
+
+def run(runs: int, summary: bool):
+    manager = ProblemManager()
+    problem = manager.get_current_problem() or next(iter(manager.problems.values()))
+    ai_flow_config = manager.get_ai_flow_config()
+    session_summary = "Step 1 (approved): restart the service\nStep 2 (pending): check the logs" if summary else None
+    cache = EvaluationContextCache()
+
+    _, old_body = legacy(problem, ai_flow_config, session_summary)
+    _, new_body = compiled(cache, problem, ai_flow_config, session_summary)
+    assert json.loads(old_body) == json.loads(new_body), "payloads differ"
+    print(f"problem {problem.id}, {len(new_body)} byte payload, session summary: {'yes' if summary else 'no'}")
+
+    before = measure("rebuild + json.dumps per request", lambda: legacy(problem, ai_flow_config, session_summary), runs)
+    after = measure("compiled prefix + splice", lambda: compiled(cache, problem, ai_flow_config, session_summary), runs)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20000)
+    parser.add_argument("--summary", action="store_true", help="include a session summary after the shared prefix")
+    args = parser.parse_args()
+    run(args.runs, args.summary)
@@ -0,0 +1,175 @@
+"""
+Benchmark of JSON serialization and response compression on a large generated catalog.
+
+Loads a generated catalog (see ``bench_startup.generate_catalog``) and reports:
+
+- serialization: time to serialize catalog records, a /problems page, a
+  stats dict and /chat/batch result lines the former way (FastAPI's
+  ``jsonable_encoder`` plus ``json.dumps``) and with orjson
+- bytes on the wire: /problems pages, /problem/current, /ai-flow/config, a
+  token-by-token /chat/stream and an NDJSON /chat/batch body, uncompressed
+  and compressed with gzip and (when installed) brotli at several levels,
+  with the time each compression takes. Streams are compressed the way
+  ``CompressionMiddleware`` sends them, flushed after every chunk.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_responses [--problems 5000] [--runs 200]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+import snapshot
+from benchmarks.bench_startup import WORDS, generate_catalog
+from catalog_loader import CatalogWatcher
+from compression import SUPPORTED_ENCODINGS, StreamCompressor
+from problem_manager import ProblemManager
+from schemas import BatchChatResult, ChatResponse, SolutionStatus
+from snapshot import dump_json
+from streaming import format_sse
+
+LEVELS = {"gzip": (1, 6, 9), "br": (4, 5, 11)}
+
+
+def json_dumps(content) -> bytes:
+    """The serializer FastAPI's JSONResponse uses"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def per_call(fn: Callable[[], object], runs: int) -> float:
+    """Mean seconds per call"""
+    fn()
+    started = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - started) / runs
+
+
+def load_catalog(directory: str) -> ProblemManager:
+    manager = ProblemManager()
+    change = CatalogWatcher(directory, lambda change: None).scan()
+    manager.update_problems(change.upserts, change.removed, change.indexes)
+    return manager
+
+
+def problems_page(manager: ProblemManager, limit: int) -> bytes:
+    """A /problems body as the endpoint renders it"""
+    ids, next_cursor = manager.catalog.query(None, None, None, None, limit)
+    return b'{"problems":' + manager.catalog.render(ids) + b',"next_cursor":' + dump_json(next_cursor) + b"}"
+
+
+def answer_tokens(count: int) -> List[str]:
+    return [f" {WORDS[(i * 5) % len(WORDS)]}" + ("." if i % 12 == 11 else "") for i in range(count)]
+
+
+def batch_results(count: int) -> List[BatchChatResult]:
+    statuses = [SolutionStatus.PENDING] * 6
+    return [
+        BatchChatResult(
+            index=i,
+            id=f"item-{i}",
+            problem_id=f"generated_{i % 50:06d}",
+            result=ChatResponse(
+                response="".join(answer_tokens(40 + i % 20)).strip(),
+                solution_evaluated=True,
+                matched_step=i % 6 + 1,
+                step_statuses=statuses,
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def serialization(manager: ProblemManager, runs: int):
+    problems = list(manager.problems.values())
+    records = [problem.model_dump() for problem in problems]
+    page = records[:200]
+    ids = [problem.id for problem in problems[:200]]
+    # Shaped like the /admin/* payloads
+    stats = {"enabled": True, "state": "closed", "limit": 16, "in_flight": 3, "hits": 1234, "misses": 56, "hit_ratio": 0.956, "retries": 7}
+    lines = batch_results(100)
+    cases: List[Tuple[str, int, Dict[str, Callable[[], object]]]] = [
+        (f"all {len(records)} catalog records", max(1, runs // 50), {
+            "json.dumps": lambda: [json_dumps(record) for record in records],
+            "orjson": lambda: [dump_json(record) for record in records],
+        }),
+        ("/problems page of 200", runs, {
+            "jsonable_encoder + json.dumps": lambda: json_dumps(jsonable_encoder(page)),
+            "json.dumps": lambda: json_dumps(page),
+            "orjson": lambda: dump_json(page),
+            "pre-serialized fragments": lambda: manager.catalog.render(ids),
+        }),
+        ("admin stats dict", runs * 20, {
+            "jsonable_encoder + json.dumps": lambda: json_dumps(jsonable_encoder(stats)),
+            "orjson": lambda: dump_json(stats),
+        }),
+        ("100 /chat/batch lines", runs, {
+            "jsonable_encoder + json.dumps": lambda: [json_dumps(jsonable_encoder(line)) for line in lines],
+            "pydantic model_dump_json": lambda: [line.model_dump_json().encode() for line in lines],
+        }),
+    ]
+    print("serialization (us per call)")
+    for name, count, variants in cases:
+        print(f"  {name}")
+        baseline = None
+        for variant, fn in variants.items():
+            elapsed = per_call(fn, count) * 1e6
+            baseline = baseline or elapsed
+            print(f"    {variant:<32} {elapsed:11.1f}  {baseline / elapsed:6.1f}x")
+
+
+def compressed_size(chunks: List[bytes], encoding: str, level: int) -> Tuple[int, float]:
+    """Bytes sent and seconds taken compressing ``chunks`` as a stream flushed after each chunk"""
+    started = time.perf_counter()
+    compressor = StreamCompressor(encoding, level)
+    size = sum(len(compressor.compress(chunk)) for chunk in chunks[:-1]) + len(compressor.finish(chunks[-1]))
+    return size, time.perf_counter() - started
+
+
+def wire_bytes(manager: ProblemManager, runs: int):
+    tokens = answer_tokens(400)
+    bodies: Dict[str, List[bytes]] = {
+        "/problems?limit=50": [problems_page(manager, 50)],
+        "/problems?limit=200": [problems_page(manager, 200)],
+        "/problem/current": [manager.snapshot.current_problem.body],
+        "/ai-flow/config": [manager.snapshot.ai_flow_config.body],
+        "/chat/stream, 400 SSE frames": [format_sse(token).encode() for token in tokens] + [format_sse("[DONE]", event="done").encode()],
+        "/chat/batch, 500 NDJSON lines": [line.model_dump_json().encode() + b"\n" for line in batch_results(500)],
+    }
+    variants = [(encoding, level) for encoding in reversed(SUPPORTED_ENCODINGS) for level in LEVELS[encoding]]
+    header = f"{'response':<32} {'identity':>9}" + "".join(f" {f'{e}-{l}':>17}" for e, l in variants)
+    print(f"\nbytes on the wire and compression time (ms); {', '.join(SUPPORTED_ENCODINGS)} available")
+    print(header)
+    print("-" * len(header))
+    for name, chunks in bodies.items():
+        row = f"{name:<32} {sum(map(len, chunks)):>9}"
+        for encoding, level in variants:
+            repeat = max(1, runs // 20) if level < 10 else 1
+            size, seconds = min(compressed_size(chunks, encoding, level) for _ in range(repeat))
+            row += f" {size:>8} {seconds * 1000:7.2f}ms"
+        print(row)
+
+
+def run(problems: int, runs: int):
+    with tempfile.TemporaryDirectory() as workdir:
+        catalog_dir = os.path.join(workdir, "problems")
+        generate_catalog(catalog_dir, problems)
+        manager = load_catalog(catalog_dir)
+    print(f"{len(manager.problems)} problems, orjson {'installed' if snapshot.orjson else 'missing'}\n")
+    serialization(manager, runs)
+    wire_bytes(manager, runs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--problems", type=int, default=5000, help="generated problems in the catalog")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    run(args.problems, args.runs)
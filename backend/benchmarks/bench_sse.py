@@ -0,0 +1,119 @@
+"""
+Benchmark of OpenAI stream parsing on a canned 2k-token SSE stream.
+
+Compares the former line-by-line parsing (``aiter_lines`` plus an
+``httpx.Response`` per line) with ``llm.sse.stream_deltas``, with and without
+delta coalescing, and reports parse time per token and the number of chunks
+handed downstream.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_sse [--tokens 2000] [--runs 20] [--paced 0.001]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import AsyncIterator, List
+
+import httpx
+
+from llm.sse import stream_deltas
+
+
+def canned_stream(tokens: int, seed: int = 7) -> List[bytes]:
+    """The stream as network reads of one to four events, split at arbitrary byte offsets"""
+    rng = random.Random(seed)
+    events = []
+    for i in range(tokens):
+        chunk = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "gpt-4o",
+            "choices": [{"index": 0, "delta": {"content": f" tok{i}"}, "finish_reason": None}],
+        }
+        events.append(f"data: {json.dumps(chunk)}\n\n".encode())
+    usage = {"prompt_tokens": 900, "completion_tokens": tokens, "total_tokens": 900 + tokens}
+    events.append(f"data: {json.dumps({'id': 'chatcmpl-bench', 'choices': [], 'usage': usage})}\n\n".encode())
+    events.append(b"data: [DONE]\n\n")
+    data = b"".join(events)
+
+    reads, position = [], 0
+    average_event = len(data) // len(events)
+    while position < len(data):
+        size = rng.randint(average_event // 2, average_event * 4)
+        reads.append(data[position:position + size])
+        position += size
+    return reads
+
+
+async def _bytes(reads: List[bytes], interval: float) -> AsyncIterator[bytes]:
+    for read in reads:
+        if interval:
+            await asyncio.sleep(interval)
+        yield read
+
+
+async def legacy(reads: List[bytes], interval: float) -> List[str]:
+    response = httpx.Response(200, content=_bytes(reads, interval))
+    out = []
+    async for line in response.aiter_lines():
+        if line.startswith("data: "):
+            data = line[len("data: "):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = httpx.Response(200, content=data).json()
+                delta = chunk["choices"][0]["delta"].get("content", "")
+                if delta:
+                    out.append(delta)
+            except Exception:
+                continue
+    return out
+
+
+async def incremental(reads: List[bytes], interval: float, flush_interval: float) -> List[str]:
+    response = httpx.Response(200, content=_bytes(reads, interval))
+    return [text async for text in stream_deltas(response.aiter_bytes(), flush_interval=flush_interval)]
+
+
+async def measure(name: str, parse, reads: List[bytes], tokens: int, runs: int, interval: float, expected: str):
+    best = float("inf")
+    chunks: List[str] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        chunks = await parse(reads, interval)
+        best = min(best, time.perf_counter() - started)
+    assert "".join(chunks) == expected, f"{name} produced different text"
+    print(f"{name:<28} {best * 1000:9.2f} ms {best / tokens * 1e6:9.2f} us/token {len(chunks):8} chunks")
+
+
+async def run(tokens: int, runs: int, paced: float):
+    reads = canned_stream(tokens)
+    expected = "".join(f" tok{i}" for i in range(tokens))
+    print(f"{tokens} tokens in {len(reads)} reads, {sum(map(len, reads))} bytes")
+
+    variants = [
+        ("aiter_lines + Response.json", legacy),
+        ("stream_deltas (per read)", lambda r, i: incremental(r, i, 0)),
+        ("stream_deltas (20 ms/256)", lambda r, i: incremental(r, i, 0.02)),
+    ]
+    print("\nunpaced (parse cost only):")
+    for name, parse in variants:
+        await measure(name, parse, reads, tokens, runs, 0, expected)
+    if paced:
+        print(f"\npaced, {paced * 1000:g} ms between reads (wall time, chunks downstream):")
+        for name, parse in variants:
+            await measure(name, parse, reads, tokens, 1, paced, expected)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--paced", type=float, default=0.001, help="seconds between network reads in the paced run; 0 to skip")
+    args = parser.parse_args()
+    asyncio.run(run(args.tokens, args.runs, args.paced))
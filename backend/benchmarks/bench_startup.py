@@ -0,0 +1,159 @@
+"""
+Cold-start benchmark of the API on a large generated problem catalog.
+
+Starts uvicorn in a fresh process per run and reports, as medians:
+
+- import: time to ``import main`` (module-level work only)
+- listening: process start until the first HTTP response of any status
+- serving: process start until ``/problem/current`` answers 200
+- ready: process start until ``/ready`` answers 200
+
+for blocking startup, blocking startup from a catalog snapshot and
+background startup from a catalog snapshot. ``serving`` only needs endpoints
+that exist on every commit, so runs on older commits compare directly.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup [--problems 5000] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.keys import LocalSigner
+from benchmarks.stubs import StubServer, free_port, stub_app
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    "latency throughput cache index shard replica queue worker timeout retry backoff "
+    "schema migration rollback deploy canary metric alert trace profile memory"
+).split()
+
+
+def generate_catalog(directory: str, count: int, per_file: int = 100) -> List[str]:
+    """Write ``count`` generated problems to JSON files of ``per_file`` problems each"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for start in range(0, count, per_file):
+        problems = []
+        for i in range(start, min(count, start + per_file)):
+            words = [WORDS[(i * 7 + k) % len(WORDS)] for k in range(12)]
+            steps = [f"Step {k + 1}: {' '.join(words[k:k + 5])} for component {i}" for k in range(6)]
+            problems.append({
+                "id": f"generated_{i:06d}",
+                "title": f"Generated problem {i}: {' '.join(words[:3])}",
+                "description": " ".join(words * 4),
+                "reference_steps": steps,
+                "required_steps": len(steps),
+                "difficulty_level": ("beginner", "intermediate", "advanced")[i % 3],
+                "category": WORDS[i % len(WORDS)],
+                "ai_flow": {
+                    "evaluation_criteria": [f"Mentions {word}" for word in words[:4]],
+                    "suggestions": [f"Consider {word}" for word in words[4:7]],
+                    "hints": [f"Look at {word}" for word in words[7:10]],
+                },
+            })
+        path = os.path.join(directory, f"problems_{start // per_file:04d}.json")
+        with open(path, "w") as f:
+            json.dump({"problems": problems}, f)
+        paths.append(path)
+    return paths
+
+
+def time_import(env: Dict[str, str]) -> float:
+    code = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env={**os.environ, **env},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_startup(env: Dict[str, str], timeout: float = 120.0) -> Dict[str, Optional[float]]:
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **env})
+    timings: Dict[str, Optional[float]] = {"listening": None, "serving": None, "ready": None}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            while timings["serving"] is None or timings["ready"] is None:
+                if server.poll() is not None or time.perf_counter() - started > timeout:
+                    raise RuntimeError("uvicorn did not start")
+                try:
+                    # /ready answers during a background warmup; other routes wait for it
+                    ready = client.get("/ready")
+                    if timings["listening"] is None:
+                        timings["listening"] = time.perf_counter() - started
+                    current = client.get("/problem/current")
+                except httpx.TransportError:
+                    time.sleep(0.005)
+                    continue
+                now = time.perf_counter() - started
+                if timings["serving"] is None and current.status_code == 200:
+                    timings["serving"] = now
+                if timings["ready"] is None and ready.status_code in (200, 404):
+                    # 404: a commit without /ready is ready once it serves
+                    timings["ready"] = now if ready.status_code == 200 else timings["serving"]
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return timings
+
+
+def median_ms(values: List[Optional[float]]) -> str:
+    values = [value for value in values if value is not None]
+    return f"{statistics.median(values) * 1000:9.1f}" if values else f"{'-':>9}"
+
+
+def run(problems: int, runs: int):
+    signer = LocalSigner()
+    with tempfile.TemporaryDirectory() as workdir, StubServer(stub_app(signer.jwks())) as stub:
+        catalog_dir = os.path.join(workdir, "problems")
+        generate_catalog(catalog_dir, problems)
+        snapshot_path = os.path.join(workdir, "catalog.snapshot")
+        base_env = {
+            "PROBLEMS_DIR": catalog_dir,
+            "JWKS_URL": f"{stub.url}/certs",
+            "SUBMISSION_LOG_PATH": os.path.join(workdir, "submissions.jsonl"),
+            "PROBLEM_STATE_PATH": os.path.join(workdir, "problem_state.db"),
+        }
+        subprocess.run(
+            [sys.executable, "-m", "catalog_snapshot", snapshot_path],
+            cwd=BACKEND_DIR, env={**os.environ, **base_env}, check=True, capture_output=True,
+        )
+        variants = [
+            ("blocking", {"STARTUP_MODE": "blocking"}),
+            ("blocking + snapshot", {"STARTUP_MODE": "blocking", "CATALOG_SNAPSHOT_PATH": snapshot_path}),
+            ("background + snapshot", {"STARTUP_MODE": "background", "CATALOG_SNAPSHOT_PATH": snapshot_path}),
+        ]
+        print(f"{problems} generated problems, median of {runs} runs (ms)")
+        header = f"{'variant':<24} {'import':>9} {'listening':>9} {'serving':>9} {'ready':>9}"
+        print(header)
+        print("-" * len(header))
+        for name, overrides in variants:
+            env = {**base_env, **overrides}
+            imports = [time_import(env) for _ in range(runs)]
+            startups = [time_startup(env) for _ in range(runs)]
+            print(
+                f"{name:<24} {median_ms(imports)} {median_ms([s['listening'] for s in startups])} "
+                f"{median_ms([s['serving'] for s in startups])} {median_ms([s['ready'] for s in startups])}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--problems", type=int, default=5000, help="generated problems in PROBLEMS_DIR")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    run(args.problems, args.runs)
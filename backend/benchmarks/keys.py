@@ -0,0 +1,38 @@
+"""
+Locally generated RS256 keys and tokens for benchmarks.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+
+class LocalSigner:
+    """An RSA key pair that signs tokens and publishes a matching JWKS"""
+
+    def __init__(self, kid: str = "bench-key"):
+        self.kid = kid
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        self.public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+        self.public_jwk["kid"] = kid
+        self.public_jwk["use"] = "sig"
+
+    def jwks(self) -> Dict[str, Any]:
+        return {"keys": [self.public_jwk]}
+
+    def token(self, sub: str = "bench-user", ttl: int = 3600, claims: Optional[Dict[str, Any]] = None) -> str:
+        payload = {"sub": sub, "exp": int(time.time()) + ttl, "role": "authenticated"}
+        payload.update(claims or {})
+        return jwt.encode(payload, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
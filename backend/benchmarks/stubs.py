@@ -0,0 +1,88 @@
+"""
+Local stand-ins for the auth server and the OpenAI API used by benchmarks.
+
+``stub_app`` serves a JWKS document at ``/certs`` and an OpenAI-compatible
+``/v1/chat/completions`` that waits ``latency`` seconds before the first token
+and then emits ``tokens`` tokens at ``token_rate`` tokens per second, as SSE
+when ``stream`` is requested and as one JSON body otherwise.
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def stub_app(jwks: Dict[str, Any], latency: float = 0.2, token_rate: float = 200.0, tokens: int = 50) -> Starlette:
+    async def certs(request: Request):
+        return JSONResponse(jwks)
+
+    async def completions(request: Request):
+        body = await request.json()
+        words = [f" word{i}" for i in range(tokens)]
+        usage = {"prompt_tokens": sum(len(m["content"].split()) for m in body["messages"]), "completion_tokens": tokens}
+        usage["total_tokens"] = usage["prompt_tokens"] + tokens
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency + tokens / token_rate)
+            return JSONResponse({
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        async def events():
+            await asyncio.sleep(latency)
+            for word in words:
+                chunk = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": word}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(1 / token_rate)
+            if body.get("stream_options", {}).get("include_usage"):
+                yield f"data: {json.dumps({'id': 'chatcmpl-bench', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[
+        Route("/certs", certs),
+        Route("/v1/chat/completions", completions, methods=["POST"]),
+    ])
+
+
+class StubServer:
+    """Run an ASGI app under uvicorn on a background thread"""
+
+    def __init__(self, app, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.run, name="benchmark-stub", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Stub server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
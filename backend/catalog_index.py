@@ -0,0 +1,141 @@
+"""
+Indexed problem catalog backing paginated /problems queries.
+
+Problems are kept in id order with secondary indexes on category and
+difficulty level and an inverted index over title and description words.
+Every problem is serialized once when it is added, so a page is assembled
+from stored fragments and costs O(page) instead of O(catalog).
+"""
+
+import base64
+import binascii
+import re
+from bisect import bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from keyword_index import STOP_WORDS
+from schemas import ProblemFramework
+from snapshot import dump_json
+
+_WORD = re.compile(r"\w+")
+
+PROBLEM_FIELDS = tuple(ProblemFramework.__fields__)
+
+
+def tokenize(text: str) -> Set[str]:
+    return {word for word in _WORD.findall(text.lower()) if word not in STOP_WORDS}
+
+
+def encode_cursor(problem_id: str) -> str:
+    return base64.urlsafe_b64encode(problem_id.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+class CatalogIndex:
+    def __init__(self, problems: Iterable[ProblemFramework] = ()):
+        self._ids: List[str] = []
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._fragments: Dict[str, bytes] = {}
+        self._terms: Dict[str, Set[str]] = {}
+        self._by_category: Dict[str, List[str]] = {}
+        self._by_difficulty: Dict[str, List[str]] = {}
+        self._problem_terms: Dict[str, Set[str]] = {}
+        for problem in problems:
+            self.add(problem)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, problem: ProblemFramework):
+        """Insert or replace a problem"""
+        if problem.id in self._records:
+            self.remove(problem.id)
+        record = problem.dict()
+        self._records[problem.id] = record
+        self._fragments[problem.id] = dump_json(record)
+        insort(self._ids, problem.id)
+        insort(self._by_category.setdefault(problem.category.lower(), []), problem.id)
+        insort(self._by_difficulty.setdefault(problem.difficulty_level.lower(), []), problem.id)
+        terms = tokenize(f"{problem.title} {problem.description}")
+        self._problem_terms[problem.id] = terms
+        for term in terms:
+            self._terms.setdefault(term, set()).add(problem.id)
+
+    def remove(self, problem_id: str):
+        record = self._records.pop(problem_id, None)
+        if record is None:
+            return
+        del self._fragments[problem_id]
+        self._ids.remove(problem_id)
+        self._discard(self._by_category, record["category"].lower(), problem_id)
+        self._discard(self._by_difficulty, record["difficulty_level"].lower(), problem_id)
+        for term in self._problem_terms.pop(problem_id):
+            postings = self._terms[term]
+            postings.discard(problem_id)
+            if not postings:
+                del self._terms[term]
+
+    @staticmethod
+    def _discard(index: Dict[str, List[str]], key: str, problem_id: str):
+        ids = index[key]
+        ids.remove(problem_id)
+        if not ids:
+            del index[key]
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        q: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[str], Optional[str]]:
+        """Return one page of problem ids in id order and the cursor of the next page"""
+        # Walk the smallest sorted candidate list and check the other filters per id
+        candidates: List[Sequence[str]] = [self._ids]
+        checks: List[Callable[[str], bool]] = []
+        if category:
+            category = category.lower()
+            candidates.append(self._by_category.get(category, []))
+            checks.append(lambda problem_id: self._records[problem_id]["category"].lower() == category)
+        if difficulty:
+            difficulty = difficulty.lower()
+            candidates.append(self._by_difficulty.get(difficulty, []))
+            checks.append(lambda problem_id: self._records[problem_id]["difficulty_level"].lower() == difficulty)
+        if q:
+            terms = tokenize(q)
+            if terms:
+                postings = sorted((self._terms.get(term, set()) for term in terms), key=len)
+                matches = set.intersection(*postings)
+                candidates.append(sorted(matches))
+                checks.append(matches.__contains__)
+        walk = min(candidates, key=len)
+
+        position = bisect_right(walk, decode_cursor(cursor)) if cursor else 0
+        page: List[str] = []
+        while position < len(walk):
+            problem_id = walk[position]
+            position += 1
+            if all(check(problem_id) for check in checks):
+                if len(page) == limit:
+                    return page, encode_cursor(page[-1])
+                page.append(problem_id)
+        return page, None
+
+    def render(self, ids: List[str], fields: Optional[List[str]] = None) -> bytes:
+        """Serialize problems from the stored fragments, optionally projected to ``fields``"""
+        if not fields:
+            return b"[" + b",".join(self._fragments[problem_id] for problem_id in ids) + b"]"
+        return dump_json([
+            {field: self._records[problem_id][field] for field in fields}
+            for problem_id in ids
+        ])
+
+    def titles(self, ids: List[str]) -> List[Tuple[str, str]]:
+        return [(problem_id, self._records[problem_id]["title"]) for problem_id in ids]
@@ -0,0 +1,217 @@
+"""
+Loads problems from a directory of YAML/JSON files and watches it for changes.
+
+Each file holds one problem, a list of problems, or a mapping with a
+``problems`` list. On every change only the files whose modification time or
+size changed are re-read, and only their problems are re-validated and
+re-indexed. The result is handed to ProblemManager.update_problems, which
+publishes a new snapshot without disturbing requests that are in flight.
+"""
+
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from keyword_index import ProblemIndex
+from schemas import ProblemFramework
+
+logger = logging.getLogger(__name__)
+
+PROBLEM_FILE_EXTENSIONS = (".yaml", ".yml", ".json")
+
+# (mtime_ns, size) identifies a file version without reading it
+FileStamp = Tuple[int, int]
+
+
+def load_problem_file(path: str) -> List[ProblemFramework]:
+    """Parse and validate every problem defined in one file"""
+    with open(path, "r") as f:
+        if path.endswith(".json"):
+            data = json.load(f)
+        else:
+            import yaml
+            data = yaml.safe_load(f)
+    if isinstance(data, dict) and "problems" in data:
+        data = data["problems"]
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a problem, a list of problems or a 'problems' mapping")
+    return [ProblemFramework(**item) for item in data]
+
+
+class CatalogChange:
+    """Problems (with freshly built indexes) added or changed, and ids removed, by one scan"""
+
+    def __init__(self):
+        self.upserts: Dict[str, ProblemFramework] = {}
+        self.indexes: Dict[str, ProblemIndex] = {}
+        self.removed: Set[str] = set()
+        self.context_changed = False
+
+    def __bool__(self) -> bool:
+        return bool(self.upserts or self.removed or self.context_changed)
+
+
+class CatalogWatcher:
+    """
+    Incrementally rescans a problem directory (and optionally the context
+    file) and applies the differences through ``on_change``.
+
+    Changes are detected with inotify through the optional ``watchfiles``
+    package when it is installed, and by polling modification times otherwise.
+    Parsing, validation and index building happen on the watcher thread;
+    ``on_change`` is delivered on the event loop passed to ``start``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        on_change: Callable[[CatalogChange], None],
+        context_path: Optional[str] = None,
+        poll_interval: float = 1.0,
+    ):
+        self.directory = directory
+        self.on_change = on_change
+        self.context_path = context_path
+        self.poll_interval = poll_interval
+        self._stamps: Dict[str, FileStamp] = {}
+        self._file_problems: Dict[str, Set[str]] = {}
+        self._context_stamp: Optional[FileStamp] = self._stamp(context_path) if context_path else None
+        self._scan_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[FileStamp]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _problem_files(self) -> Dict[str, FileStamp]:
+        stamps = {}
+        if not os.path.isdir(self.directory):
+            return stamps
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith(".") or not name.endswith(PROBLEM_FILE_EXTENSIONS):
+                continue
+            path = os.path.join(self.directory, name)
+            stamp = self._stamp(path)
+            if stamp is not None:
+                stamps[path] = stamp
+        return stamps
+
+    def _watches(self, path: str) -> bool:
+        """Whether a changed path is the context file or a problem file, not something else sharing its directory"""
+        path = os.path.realpath(path)
+        if self.context_path and path == os.path.realpath(self.context_path):
+            return True
+        directory, name = os.path.split(path)
+        return (
+            directory == os.path.realpath(self.directory)
+            and not name.startswith(".")
+            and name.endswith(PROBLEM_FILE_EXTENSIONS)
+        )
+
+    def export_state(self) -> Dict[str, Any]:
+        """File versions and the problems they defined, for a catalog snapshot"""
+        with self._scan_lock:
+            return {
+                "directory": os.path.abspath(self.directory),
+                "stamps": dict(self._stamps),
+                "file_problems": {path: set(ids) for path, ids in self._file_problems.items()},
+            }
+
+    def restore_state(self, state: Dict[str, Any]):
+        """Resume from exported state, so the next scan re-reads only files changed since"""
+        if state.get("directory") != os.path.abspath(self.directory):
+            return
+        with self._scan_lock:
+            self._stamps = dict(state["stamps"])
+            self._file_problems = {path: set(ids) for path, ids in state["file_problems"].items()}
+
+    def scan(self) -> CatalogChange:
+        """Re-read only files that changed since the previous scan"""
+        with self._scan_lock:
+            change = CatalogChange()
+            current = self._problem_files()
+
+            for path in set(self._stamps) - set(current):
+                change.removed |= self._file_problems.pop(path, set())
+                del self._stamps[path]
+
+            for path, stamp in current.items():
+                if self._stamps.get(path) == stamp:
+                    continue
+                try:
+                    problems = load_problem_file(path)
+                except Exception as e:
+                    # Keep serving the last valid version of this file
+                    logger.warning("Skipping invalid problem file %s: %s", path, e)
+                    continue
+                ids = {problem.id for problem in problems}
+                change.removed |= self._file_problems.get(path, set()) - ids
+                self._file_problems[path] = ids
+                self._stamps[path] = stamp
+                for problem in problems:
+                    change.upserts[problem.id] = problem
+                    change.indexes[problem.id] = ProblemIndex(problem)
+
+            # A problem that moved to another file is an update, not a removal
+            change.removed -= set(change.upserts)
+
+            if self.context_path:
+                stamp = self._stamp(self.context_path)
+                if stamp != self._context_stamp:
+                    self._context_stamp = stamp
+                    change.context_changed = stamp is not None
+            return change
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _rescan(self):
+        try:
+            change = self.scan()
+        except Exception as e:
+            logger.warning("Problem catalog scan failed: %s", e)
+            return
+        if change and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.on_change, change)
+
+    def _run(self):
+        if importlib.util.find_spec("watchfiles") is not None:
+            from watchfiles import watch
+
+            paths = [self.directory] + ([os.path.dirname(os.path.abspath(self.context_path))] if self.context_path else [])
+            try:
+                for _ in watch(
+                    *paths,
+                    # The context file's directory also holds logs and databases written on every request
+                    watch_filter=lambda change, path: self._watches(path),
+                    stop_event=self._stop,
+                    rust_timeout=int(self.poll_interval * 1000) or 1000,
+                ):
+                    self._rescan()
+                return
+            except Exception as e:
+                logger.warning("File notifications unavailable (%s); polling %s instead", e, self.directory)
+        while not self._stop.wait(self.poll_interval):
+            self._rescan()
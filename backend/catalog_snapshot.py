@@ -0,0 +1,100 @@
+"""
+Prebuilt, serialized problem catalogs for fast startup.
+
+Validating every ProblemFramework and building its keyword index is the bulk
+of startup work for a large catalog. A snapshot pickles the validated
+problems, their indexes, the catalog index and the catalog watcher's file
+versions, so a starting worker only unpickles them and re-reads the
+PROBLEMS_DIR files that changed since the snapshot was built.
+
+A snapshot is ignored (and the catalog built from source) when it was made
+by other catalog or index code, another Python version or for another
+problem directory. Snapshots are pickles: only load files you built.
+
+Build one from the backend directory, e.g. while building the image:
+
+    PROBLEMS_DIR=problems python -m catalog_snapshot catalog.snapshot
+"""
+
+import argparse
+import gc
+import hashlib
+import logging
+import os
+import pickle
+import sys
+from typing import Any, Dict, Optional
+
+from catalog_loader import CatalogWatcher
+from problem_manager import ProblemManager
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+# Modules defining the built-in catalog and the classes stored in a snapshot
+SOURCE_FILES = ("problems_config.py", "schemas.py", "keyword_index.py", "catalog_index.py")
+
+
+def catalog_fingerprint(directory: Optional[str]) -> str:
+    """Identifies the code, interpreter and problem directory a snapshot is valid for"""
+    digest = hashlib.sha256(f"{SNAPSHOT_FORMAT}:{sys.version_info[:2]}:".encode())
+    digest.update(os.path.abspath(directory).encode() if directory else b"-")
+    base = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCE_FILES:
+        with open(os.path.join(base, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def save_catalog_snapshot(path: str, manager: ProblemManager, watcher: Optional[CatalogWatcher] = None):
+    """Write the loaded catalog of ``manager`` to ``path`` atomically"""
+    fingerprint = catalog_fingerprint(watcher.directory if watcher else None)
+    snapshot = {
+        "problems": manager.problems,
+        "indexes": manager.indexes,
+        "catalog": manager.catalog,
+        "ai_flow_config": manager.get_ai_flow_config(),
+        "watcher": watcher.export_state() if watcher else None,
+    }
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        # The fingerprint comes first so a stale snapshot is rejected without unpickling the catalog
+        pickle.dump(fingerprint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def load_catalog_snapshot(path: str, directory: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The snapshot at ``path``, or None if there is none or it does not match this build"""
+    if not os.path.exists(path):
+        return None
+    # Unpickling creates millions of objects; cyclic GC passes over them would only slow it down
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as f:
+            if pickle.load(f) != catalog_fingerprint(directory):
+                logger.warning("Ignoring catalog snapshot %s built for another catalog or code version", path)
+                return None
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning("Ignoring unreadable catalog snapshot %s: %s", path, e)
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a catalog snapshot from problems_config.py and PROBLEMS_DIR")
+    parser.add_argument("output", help="snapshot file to write")
+    args = parser.parse_args()
+
+    manager = ProblemManager()
+    watcher = None
+    if os.getenv("PROBLEMS_DIR"):
+        watcher = CatalogWatcher(os.environ["PROBLEMS_DIR"], lambda change: None)
+        change = watcher.scan()
+        manager.update_problems(change.upserts, change.removed, change.indexes)
+    save_catalog_snapshot(args.output, manager, watcher)
+    print(f"Wrote {len(manager.problems)} problems to {args.output}")
@@ -0,0 +1,237 @@
+"""
+Response compression negotiated from the request's Accept-Encoding.
+
+Whole JSON and text bodies are compressed once they reach a minimum size;
+smaller ones are sent as they are, since the encoding overhead outweighs the
+savings. Streamed bodies (server-sent events from /chat/stream, NDJSON from
+/chat/batch) are compressed incrementally and flushed after every chunk, so
+each frame still reaches the client as soon as it is produced while later
+frames are encoded against the earlier ones.
+
+Brotli is used when the ``brotli`` package is installed and the client
+accepts it, gzip otherwise.
+"""
+
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# In order of preference when the client weighs them equally. Flushed after
+# every small chunk, brotli streams come out larger than gzip ones.
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+STREAM_ENCODINGS: Tuple[str, ...] = ("gzip", "br") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Statuses whose responses have no body to compress
+_BODYLESS_STATUSES = frozenset({204, 206, 304})
+
+
+def negotiate_encoding(accept_encoding: str, supported: Tuple[str, ...] = SUPPORTED_ENCODINGS) -> Optional[str]:
+    """
+    The supported content coding the client weighs highest, or None for
+    identity. Codings with ``q=0`` are refused; ``*`` stands for any coding
+    not listed by name.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding] = weight
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for coding in supported:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of the ``encoding`` representation: a different byte sequence needs a different strong tag"""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+class StreamCompressor:
+    """Compresses a body chunk by chunk, flushing each chunk to the output at once"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, chunk: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.finish()
+        return self._compressor.compress(chunk) + self._compressor.flush()
+
+
+class CompressionPolicy:
+    """
+    When and how hard to compress: bodies under ``minimum_size`` bytes are
+    sent uncompressed, ``gzip_level`` and ``brotli_quality`` set the effort,
+    and ``streams`` enables compression of streamed responses.
+    """
+
+    def __init__(self, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5, streams: bool = True):
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.streams = streams
+        self.compressed = 0
+        self.streamed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def negotiate(self, accept_encoding: str, streaming: bool = False) -> Optional[str]:
+        return negotiate_encoding(accept_encoding, STREAM_ENCODINGS if streaming else SUPPORTED_ENCODINGS)
+
+    def level(self, encoding: str) -> int:
+        return self.brotli_quality if encoding == "br" else self.gzip_level
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        compressed = StreamCompressor(encoding, self.level(encoding)).finish(data)
+        self.record(len(data), len(compressed))
+        return compressed
+
+    def stream(self, encoding: str) -> StreamCompressor:
+        return StreamCompressor(encoding, self.level(encoding))
+
+    def record(self, bytes_in: int, bytes_out: int):
+        self.compressed += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "encodings": list(SUPPORTED_ENCODINGS),
+            "minimum_size": self.minimum_size,
+            "compressed_responses": self.compressed,
+            "compressed_streams": self.streamed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower() or vary == b"*":
+        return headers
+    return [(key, value) for key, value in headers if key.lower() != b"vary"] + [(b"vary", vary + b", Accept-Encoding")]
+
+
+class CompressionMiddleware:
+    """
+    Compresses compressible responses the client accepts an encoding for.
+    Responses that already carry a Content-Encoding (such as pre-compressed
+    JSON bodies) pass through untouched. A body sent in one piece is
+    compressed whole if it reaches the policy's minimum size; a streamed
+    body is compressed chunk by chunk with a flush after each.
+    """
+
+    def __init__(self, app, policy: CompressionPolicy):
+        self.app = app
+        self.policy = policy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        policy = self.policy
+        start: Optional[dict] = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (
+                    message["status"] in _BODYLESS_STATUSES
+                    or _header(headers, b"content-encoding") is not None
+                    or not is_compressible(content_type)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether the body is streamed
+                    start = {**message, "headers": _add_vary(headers)}
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is not None:
+                if not more_body:
+                    await send({"type": "http.response.body", "body": compressor.finish(body)})
+                elif body:
+                    await send({"type": "http.response.body", "body": compressor.compress(body), "more_body": True})
+                return
+            encoding = None
+            if policy.streams if more_body else len(body) >= policy.minimum_size:
+                encoding = policy.negotiate(accept_encoding, streaming=more_body)
+            if encoding is None:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            headers = [(key, value) for key, value in start["headers"] if key.lower() not in (b"content-length", b"etag")]
+            etag = _header(start["headers"], b"etag")
+            if etag is not None:
+                headers.append((b"etag", encoded_etag(etag.decode("latin-1"), encoding).encode("latin-1")))
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            if more_body:
+                policy.streamed += 1
+                compressor = policy.stream(encoding)
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": compressor.compress(body), "more_body": True})
+                return
+            compressed = policy.compress(body, encoding)
+            headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+            passthrough = True
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,10 +1,12 @@
+import hashlib
 import os
-import yaml
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List
 
 CONTEXT_PATH = os.environ.get("CONTEXT_PATH", os.path.join(os.path.dirname(__file__), "context.yaml"))
 
 _context_cache: Dict[str, Any] = {}
+_context_version: Dict[str, Any] = {}
+_reload_listeners: List[Callable[[Dict[str, Any]], None]] = []
 
 def load_context() -> Dict[str, Any]:
     """
@@ -16,14 +18,18 @@ def load_context() -> Dict[str, Any]:
         return _context_cache
     if not os.path.exists(CONTEXT_PATH):
         raise FileNotFoundError(f"Context file not found: {CONTEXT_PATH}")
-    with open(CONTEXT_PATH, "r") as f:
-        if CONTEXT_PATH.endswith(".yaml") or CONTEXT_PATH.endswith(".yml"):
-            context = yaml.safe_load(f)
-        elif CONTEXT_PATH.endswith(".json"):
-            import json
-            context = json.load(f)
-        else:
-            raise ValueError("Context file must be .yaml, .yml, or .json")
+    with open(CONTEXT_PATH, "rb") as f:
+        raw = f.read()
+        mtime = os.fstat(f.fileno()).st_mtime
+    if CONTEXT_PATH.endswith(".yaml") or CONTEXT_PATH.endswith(".yml"):
+        import yaml
+        context = yaml.safe_load(raw)
+    elif CONTEXT_PATH.endswith(".json"):
+        import json
+        context = json.loads(raw)
+    else:
+        raise ValueError("Context file must be .yaml, .yml, or .json")
+    _context_version.update(digest=hashlib.sha256(raw).hexdigest(), mtime=mtime)
     _context_cache = context
     return context
 
@@ -33,10 +39,33 @@ def get_context() -> Dict[str, Any]:
     """
     return load_context()
 
+def get_context_digest() -> str:
+    """
+    Returns the sha256 of the loaded context file, which changes whenever its content does.
+    """
+    load_context()
+    return _context_version["digest"]
+
+def get_context_mtime() -> float:
+    """
+    Returns the modification time of the context file when it was loaded.
+    """
+    load_context()
+    return _context_version["mtime"]
+
 def reload_context() -> Dict[str, Any]:
     """
     Forces reload of the context file (for hot reload/admin update).
     """
     global _context_cache
     _context_cache = {}
-    return load_context() 
\ No newline at end of file
+    context = load_context()
+    for listener in _reload_listeners:
+        listener(context)
+    return context
+
+def add_reload_listener(listener: Callable[[Dict[str, Any]], None]):
+    """
+    Registers a callback invoked with the new context after reload_context.
+    """
+    _reload_listeners.append(listener) 
\ No newline at end of file
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from problem_manager import ProblemManager
+from schemas import ChatResponse
+from metrics import STAGE_LATENCY
+
+EXECUTION_MODES = ("inline", "thread", "process")
+
+# Worker-process copy of the problem manager, installed by _init_worker
+_worker_manager: Optional[ProblemManager] = None
+
+
+def _init_worker(manager: ProblemManager):
+    """Install the preloaded problem manager (with its indexes) in a worker process"""
+    global _worker_manager
+    _worker_manager = manager
+
+
+def _evaluate_in_worker(problem_id: str, user_input: str, completed_mask: int) -> ChatResponse:
+    current = _worker_manager.get_current_problem()
+    if current is None or current.id != problem_id:
+        _worker_manager.set_active_problem(problem_id)
+    return _worker_manager.evaluate_solution(user_input, completed_mask)
+
+
+def _evaluate_many_in_worker(items: Sequence[Tuple[str, str]], completed_masks: Optional[Sequence[int]]) -> List[Optional[ChatResponse]]:
+    return _worker_manager.evaluate_many(items, completed_masks)
+
+
+class EvaluationQueueFullError(Exception):
+    """Raised when the evaluation backlog is at capacity"""
+
+
+def _ping(_: int) -> None:
+    """No-op task used to bring pool workers up"""
+
+
+class EvaluationExecutor:
+    """
+    Runs ProblemManager evaluation inline, on a thread pool or on a process
+    pool, behind a bounded queue.
+
+    Submissions beyond ``max_pending`` outstanding evaluations are rejected
+    with EvaluationQueueFullError instead of piling up on the event loop.
+    In process mode every worker receives a pickled copy of the preloaded
+    problem manager, so the keyword indexes are built once in the parent and
+    never rebuilt per task.
+    """
+
+    def __init__(
+        self,
+        problem_manager: ProblemManager,
+        mode: str = "inline",
+        workers: Optional[int] = None,
+        max_pending: int = 256,
+    ):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown evaluation backend {mode!r}, expected one of {EXECUTION_MODES}")
+        self.problem_manager = problem_manager
+        self.mode = mode
+        self.workers = 1 if mode == "inline" else (workers or os.cpu_count() or 1)
+        self.max_pending = max_pending
+
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "thread":
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="evaluation"
+                )
+            else:
+                # Imported here so inline and thread modes never load multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.problem_manager,),
+                )
+        return self._executor
+
+    def warm_up(self):
+        """Start every pool worker now instead of on the first evaluations"""
+        if self.mode == "inline":
+            return
+        executor = self._get_executor()
+        list(executor.map(_ping, range(self.workers)))
+
+    async def evaluate(self, user_input: str, completed_mask: int = 0) -> ChatResponse:
+        """Evaluate a submission against the active problem on the configured backend"""
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise EvaluationQueueFullError(
+                f"Evaluation queue is full ({self.max_pending} pending)"
+            )
+        self._pending += 1
+        self._peak_pending = max(self._peak_pending, self._pending)
+        started = time.perf_counter()
+        try:
+            if self.mode == "inline":
+                return self.problem_manager.evaluate_solution(user_input, completed_mask)
+            loop = asyncio.get_running_loop()
+            if self.mode == "thread":
+                return await loop.run_in_executor(
+                    self._get_executor(), self.problem_manager.evaluate_solution, user_input, completed_mask
+                )
+            current = self.problem_manager.get_current_problem()
+            if current is None:
+                return self.problem_manager.evaluate_solution(user_input, completed_mask)
+            return await loop.run_in_executor(
+                self._get_executor(), _evaluate_in_worker, current.id, user_input, completed_mask
+            )
+        finally:
+            STAGE_LATENCY.observe(time.perf_counter() - started, "evaluation")
+            self._pending -= 1
+            self._completed += 1
+
+    async def evaluate_many(
+        self, items: Sequence[Tuple[str, str]], completed_masks: Optional[Sequence[int]] = None
+    ) -> List[Optional[ChatResponse]]:
+        """
+        Evaluate ``(problem_id, user_input)`` pairs in one vectorized pass on
+        the configured backend. A batch occupies a single queue slot.
+        """
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise EvaluationQueueFullError(
+                f"Evaluation queue is full ({self.max_pending} pending)"
+            )
+        self._pending += 1
+        self._peak_pending = max(self._peak_pending, self._pending)
+        started = time.perf_counter()
+        try:
+            if self.mode == "inline":
+                return self.problem_manager.evaluate_many(items, completed_masks)
+            loop = asyncio.get_running_loop()
+            worker = self.problem_manager.evaluate_many if self.mode == "thread" else _evaluate_many_in_worker
+            return await loop.run_in_executor(self._get_executor(), worker, items, completed_masks)
+        finally:
+            STAGE_LATENCY.observe(time.perf_counter() - started, "evaluation")
+            self._pending -= 1
+            self._completed += 1
+
+    def restart(self):
+        """Replace the worker pool so process workers pick up a changed catalog"""
+        old, self._executor = self._executor, None
+        if old is not None:
+            # Let evaluations already submitted to the old pool finish
+            old.shutdown(wait=False)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        """Queue depth and throughput counters"""
+        running = min(self._pending, self.workers)
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "running": running,
+            "queue_depth": self._pending - running,
+            "peak_pending": self._peak_pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
@@ -0,0 +1,71 @@
+"""
+Chat command routing shared by the chat endpoints.
+
+Every command phrase is compiled into one alternation regex, so routing a
+message is a single lowercase pass and a single scan no matter how many
+commands exist. Command replies are rendered once per snapshot version and
+served from a cache until the active problem or catalog changes.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Pattern, Sequence
+
+from snapshot import ActiveProblemSnapshot
+
+SHOW_PROBLEM = "show_problem"
+LIST_PROBLEMS = "list_problems"
+
+
+class CommandRouter:
+    """
+    Matches chat messages against command phrases (case-insensitive
+    substring semantics). When phrases of several commands occur in one
+    message, the command registered first wins.
+    """
+
+    def __init__(self):
+        self._renderers: Dict[str, Callable[[ActiveProblemSnapshot], str]] = {}
+        self._priority: Dict[str, int] = {}
+        self._command_by_phrase: Dict[str, str] = {}
+        self._pattern: Optional[Pattern[str]] = None
+        self._replies: Dict[str, str] = {}
+        self._replies_version = -1
+
+    def add_command(self, name: str, phrases: Sequence[str], render: Callable[[ActiveProblemSnapshot], str]):
+        self._renderers[name] = render
+        self._priority[name] = len(self._priority)
+        for phrase in phrases:
+            self._command_by_phrase.setdefault(phrase.lower(), name)
+        # Longest first so a phrase never loses to one of its own prefixes
+        phrases_by_length = sorted(self._command_by_phrase, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(phrase) for phrase in phrases_by_length))
+
+    def match(self, user_input: str) -> Optional[str]:
+        """Return the command named in ``user_input``, if any"""
+        if self._pattern is None:
+            return None
+        best: Optional[str] = None
+        for found in self._pattern.finditer(user_input.lower()):
+            command = self._command_by_phrase[found.group()]
+            if best is None or self._priority[command] < self._priority[best]:
+                best = command
+                if self._priority[best] == 0:
+                    break
+        return best
+
+    def reply(self, user_input: str, snapshot: ActiveProblemSnapshot) -> Optional[str]:
+        """Pre-rendered reply for a command message, or None for anything else"""
+        command = self.match(user_input)
+        if command is None:
+            return None
+        if snapshot.version != self._replies_version:
+            self._replies = {}
+            self._replies_version = snapshot.version
+        reply = self._replies.get(command)
+        if reply is None:
+            reply = self._replies[command] = self._renderers[command](snapshot)
+        return reply
+
+    @property
+    def commands(self) -> List[str]:
+        return list(self._renderers)
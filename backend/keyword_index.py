@@ -0,0 +1,146 @@
+import re
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+import numpy as np
+
+from schemas import ProblemFramework, SolutionStatus
+
+APPROVED_THRESHOLD = 0.6  # 60% keyword match threshold
+REFINEMENT_THRESHOLD = 0.3  # 30% keyword match threshold
+
+# Status by match level: 0 below refinement, 1 refinement, 2 approved
+_STATUS_BY_LEVEL = (SolutionStatus.REJECTED, SolutionStatus.NEEDS_REFINEMENT, SolutionStatus.APPROVED)
+
+STOP_WORDS = frozenset({"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by"})
+
+
+def extract_keywords(text: str) -> List[str]:
+    """Extract meaningful keywords from reference text"""
+    # Simple keyword extraction - in production, use NLP libraries
+    words = text.lower().split()
+    keywords = [word for word in words if len(word) > 3 and word not in STOP_WORDS]
+    return keywords[:5]  # Top 5 keywords
+
+
+def completed_steps(completed_masks: Sequence[int], steps: int) -> np.ndarray:
+    """Boolean inputs x steps matrix of the steps set in each ``completed_mask``"""
+    masks = np.array(completed_masks, dtype=np.int64).reshape(-1, 1)
+    return (masks >> np.arange(steps)) & 1 == 1
+
+
+def rank_steps(coverage: np.ndarray, completed: np.ndarray) -> np.ndarray:
+    """
+    Ranking scores per row of ``coverage``. Completed steps drop to the bottom,
+    but only when some other step reaches REFINEMENT_THRESHOLD: a completed
+    step the input clearly matches beats an uncompleted one it would fail.
+    """
+    steer = ((coverage >= REFINEMENT_THRESHOLD) & ~completed).any(axis=-1, keepdims=True)
+    return np.where(steer & completed, -1.0, coverage)
+
+
+class StepScores(NamedTuple):
+    """Result of scoring one submission against every reference step"""
+    best_step: int
+    statuses: List[SolutionStatus]
+    coverage: np.ndarray
+
+
+class ProblemIndex:
+    """
+    Precomputed keyword index for one problem.
+
+    Keywords for every reference step are extracted once and compiled into a
+    single alternation regex with word-boundary semantics, so matching a
+    submission is one pass over the input regardless of how many steps or
+    keywords the problem has. A steps x vocabulary term matrix then scores the
+    matched keywords against all steps with a single matrix-vector product.
+    """
+
+    def __init__(self, problem: ProblemFramework):
+        self.problem_id = problem.id
+        self.step_keywords: Tuple[Tuple[str, ...], ...] = tuple(
+            tuple(extract_keywords(step)) for step in problem.reference_steps
+        )
+        self.vocabulary: Tuple[str, ...] = tuple(sorted({kw for kws in self.step_keywords for kw in kws}))
+        self.pattern: Optional[Pattern[str]] = self._compile(self.vocabulary)
+
+        self.columns: Dict[str, int] = {kw: i for i, kw in enumerate(self.vocabulary)}
+        self.term_matrix = np.zeros((len(self.step_keywords), len(self.vocabulary)), dtype=np.float64)
+        for row, keywords in enumerate(self.step_keywords):
+            for keyword in keywords:
+                self.term_matrix[row, self.columns[keyword]] += 1
+        self.keyword_counts = np.array([len(kws) for kws in self.step_keywords], dtype=np.float64)
+
+    @staticmethod
+    def _compile(vocabulary: Tuple[str, ...]) -> Optional[Pattern[str]]:
+        if not vocabulary:
+            return None
+        # Longest first so a keyword never loses to one of its own prefixes
+        alternatives = "|".join(re.escape(kw) for kw in sorted(vocabulary, key=len, reverse=True))
+        return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)")
+
+    def match(self, user_input: str) -> FrozenSet[str]:
+        """Return the set of indexed keywords present in ``user_input``"""
+        if self.pattern is None:
+            return frozenset()
+        return frozenset(self.pattern.findall(user_input.lower()))
+
+    def vectorize(self, matched: FrozenSet[str]) -> np.ndarray:
+        """Indicator vector over the vocabulary for a matched keyword set"""
+        vector = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for keyword in matched:
+            vector[self.columns[keyword]] = 1.0
+        return vector
+
+    def score(self, user_input: str, completed_mask: int = 0) -> StepScores:
+        """
+        Score a submission against every reference step in one pass.
+        Steps set in ``completed_mask`` are ranked as in ``rank_steps``.
+        """
+        matches = self.term_matrix @ self.vectorize(self.match(user_input))
+        return self._scores_from_matches(matches, completed_mask)
+
+    def _scores_from_matches(self, matches: np.ndarray, completed_mask: int = 0) -> StepScores:
+        counts = self.keyword_counts
+        approved = matches >= counts * APPROVED_THRESHOLD
+        refinement = matches >= counts * REFINEMENT_THRESHOLD
+        statuses = [
+            SolutionStatus.APPROVED if a else SolutionStatus.NEEDS_REFINEMENT if r else SolutionStatus.REJECTED
+            for a, r in zip(approved.tolist(), refinement.tolist())
+        ]
+        # Steps without keywords carry no evidence, so they never win the ranking
+        coverage = np.divide(matches, counts, out=np.zeros_like(matches), where=counts > 0)
+        ranking = rank_steps(coverage, completed_steps([completed_mask], len(coverage))[0]) if completed_mask else coverage
+        best_step = int(np.argmax(ranking)) if len(coverage) else 0
+        return StepScores(best_step=best_step, statuses=statuses, coverage=coverage)
+
+    def score_many(self, user_inputs: Sequence[str], completed_masks: Optional[Sequence[int]] = None) -> List[StepScores]:
+        """
+        Score a batch of submissions at once: an inputs x vocabulary indicator
+        matrix times the transposed term matrix gives every input's matches
+        against every step, and thresholds and ranking run on whole arrays.
+        ``completed_masks`` gives each input's completed steps, ranked as in
+        ``score`` so a batch item and a single submission get the same step.
+        """
+        indicators = np.zeros((len(user_inputs), len(self.vocabulary)), dtype=np.float64)
+        if self.pattern is not None:
+            columns = self.columns
+            for row, user_input in enumerate(user_inputs):
+                for keyword in self.pattern.findall(user_input.lower()):
+                    indicators[row, columns[keyword]] = 1.0
+        matches = indicators @ self.term_matrix.T
+        counts = self.keyword_counts
+        levels = (matches >= counts * REFINEMENT_THRESHOLD).astype(np.int8) + (matches >= counts * APPROVED_THRESHOLD)
+        coverage = np.divide(matches, counts, out=np.zeros_like(matches), where=counts > 0)
+        ranking = coverage
+        if completed_masks is not None and any(completed_masks):
+            ranking = rank_steps(coverage, completed_steps(completed_masks, len(counts)))
+        best_steps = ranking.argmax(axis=1) if len(counts) else np.zeros(len(user_inputs), dtype=np.intp)
+        return [
+            StepScores(
+                best_step=int(best),
+                statuses=[_STATUS_BY_LEVEL[level] for level in row_levels],
+                coverage=row_coverage,
+            )
+            for best, row_levels, row_coverage in zip(best_steps.tolist(), levels.tolist(), coverage)
+        ]
@@ -2,6 +2,12 @@ from abc import ABC, abstractmethod
 from typing import Any, Dict, AsyncGenerator
 
 class LLMBase(ABC):
+    async def startup(self):
+        """Acquire long-lived resources such as pooled HTTP clients (called on app startup)"""
+
+    async def aclose(self):
+        """Release resources acquired in startup (called on app shutdown)"""
+
     @abstractmethod
     async def chat(
         self,
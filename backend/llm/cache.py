@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from .base import LLMBase
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_input(user_input: str) -> str:
+    """Collapse case, whitespace and surrounding punctuation so near-identical answers share a key"""
+    return _WHITESPACE.sub(" ", user_input.lower()).strip(" .!?;:,")
+
+
+def context_hash(context: Dict[str, Any]) -> str:
+    prompt = context.get("prompt")
+    if prompt is not None:
+        # The compiled prompt is exactly what reaches the upstream (a session summary included) and is already hashed
+        return prompt.digest
+    return hashlib.sha256(json.dumps(context, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def cache_key(context: Dict[str, Any], user_input: str, temperature: float, max_tokens: int) -> str:
+    parts = [
+        str(context.get("problem_id", "")),
+        context_hash(context),
+        normalize_input(user_input),
+        repr(float(temperature)),
+        str(max_tokens),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of complete LLM responses stored as their chunk lists,
+    with an optional SQLite tier that survives restarts.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600.0, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries: "OrderedDict[str, Tuple[List[str], float]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, chunks TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _remember(self, key: str, chunks: List[str], stored_at: float):
+        self._entries[key] = (chunks, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[List[str], float]]:
+        with self._db_lock:
+            row = self._db.execute("SELECT chunks, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _disk_put(self, key: str, chunks: List[str], stored_at: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, chunks, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(chunks), stored_at),
+            )
+            self._db.commit()
+
+    async def get(self, key: str) -> Optional[List[str]]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[1] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        if entry is not None:
+            del self._entries[key]
+        if self._db is not None:
+            stored = await asyncio.to_thread(self._disk_get, key)
+            if stored is not None and now - stored[1] < self.ttl:
+                self._remember(key, stored[0], stored[1])
+                self.disk_hits += 1
+                return stored[0]
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, chunks: List[str]):
+        stored_at = time.time()
+        self._remember(key, chunks, stored_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, chunks, stored_at)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+class CachedLLM(LLMBase):
+    """
+    Serves repeated evaluations from a ResponseCache in front of another LLM.
+    Streaming hits replay the stored chunks; only complete responses are stored.
+    """
+
+    def __init__(self, inner: LLMBase, cache: ResponseCache):
+        self.inner = inner
+        self.cache = cache
+
+    async def startup(self):
+        await self.inner.startup()
+
+    async def aclose(self):
+        await self.inner.aclose()
+        self.cache.close()
+
+    async def chat(
+        self,
+        context: Dict[str, Any],
+        user_input: str,
+        temperature: float = 0.3,
+        max_tokens: int = 512,
+        stream: bool = False,
+    ) -> AsyncGenerator[str, None]:
+        key = cache_key(context, user_input, temperature, max_tokens)
+        chunks = await self.cache.get(key)
+        if chunks is not None:
+            if stream:
+                for chunk in chunks:
+                    yield chunk
+            else:
+                yield "".join(chunks)
+            return
+
+        received: List[str] = []
+        async for chunk in self.inner.chat(context, user_input, temperature, max_tokens, stream):
+            received.append(chunk)
+            yield chunk
+        if received:
+            await self.cache.put(key, received)
@@ -0,0 +1,110 @@
+import asyncio
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from .base import LLMBase
+from .cache import cache_key
+
+
+class _Flight:
+    """One upstream call whose chunks are buffered and fanned out to every waiter"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._updated = asyncio.Event()
+
+    def _notify(self):
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+
+    def append(self, chunk: str):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def follow(self) -> AsyncGenerator[str, None]:
+        """Yield the chunks buffered so far, then the rest as they arrive"""
+        position = 0
+        while True:
+            updated = self._updated
+            if position < len(self.chunks):
+                chunk = self.chunks[position]
+                position += 1
+                yield chunk
+                continue
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await updated.wait()
+
+
+class CoalescingLLM(LLMBase):
+    """
+    Single-flight wrapper: concurrent identical requests share one upstream
+    call. The upstream call runs in its own task so a disconnecting caller
+    does not cancel it for the others, and callers that join late first
+    receive the chunks buffered so far and then the live remainder.
+    """
+
+    def __init__(self, inner: LLMBase):
+        self.inner = inner
+        self._flights: Dict[str, _Flight] = {}
+        self._tasks = set()
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    async def startup(self):
+        await self.inner.startup()
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    async def _run(self, key: str, flight: _Flight, args: tuple):
+        try:
+            async for chunk in self.inner.chat(*args):
+                flight.append(chunk)
+        except Exception as e:
+            flight.finish(e)
+        else:
+            flight.finish()
+        finally:
+            self._flights.pop(key, None)
+
+    async def chat(
+        self,
+        context: Dict[str, Any],
+        user_input: str,
+        temperature: float = 0.3,
+        max_tokens: int = 512,
+        stream: bool = False,
+    ) -> AsyncGenerator[str, None]:
+        key = f"{cache_key(context, user_input, temperature, max_tokens)}:{int(stream)}"
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            self.upstream_calls += 1
+            task = asyncio.get_running_loop().create_task(
+                self._run(key, flight, (context, user_input, temperature, max_tokens, stream))
+            )
+            # Keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self.coalesced += 1
+
+        async for chunk in flight.follow():
+            yield chunk
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._flights),
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+        }
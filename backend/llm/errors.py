@@ -0,0 +1,54 @@
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Statuses worth retrying; 429 and 503 also mean the upstream is overloaded
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+OVERLOAD_STATUSES = frozenset({429, 503})
+
+
+class LLMError(Exception):
+    """Base class for failures of an LLM backend"""
+
+
+class LLMUpstreamError(LLMError):
+    """
+    The upstream API answered with an error status or could not be reached.
+    ``status_code`` is None for connection failures and timeouts.
+    """
+
+    def __init__(self, status_code: Optional[int], message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code is None or self.status_code in RETRYABLE_STATUSES
+
+    @property
+    def overload(self) -> bool:
+        return self.status_code is None or self.status_code in OVERLOAD_STATUSES
+
+
+class LLMUnavailableError(LLMError):
+    """
+    The upstream cannot serve this request right now: the circuit is open,
+    the request deadline passed, or retries were exhausted. Callers are
+    expected to fall back to local evaluation.
+    """
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header given as seconds or an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
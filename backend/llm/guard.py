@@ -0,0 +1,284 @@
+"""
+Upstream protection for LLM backends: an adaptive concurrency limit, retries
+with jittered backoff, a circuit breaker and per-request deadlines.
+"""
+
+import asyncio
+import contextvars
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Deque, Dict, Optional
+
+from .base import LLMBase
+from .errors import LLMUnavailableError, LLMUpstreamError
+
+# Absolute time.monotonic() deadline of the request being served, if any
+request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+def set_request_deadline(seconds: float):
+    """Give the current request ``seconds`` to finish its upstream calls"""
+    request_deadline.set(time.monotonic() + seconds)
+
+
+class _StreamDeadline:
+    """
+    One timer for a whole upstream stream instead of a timeout per chunk.
+    When the deadline passes while the stream waits on the upstream, the task
+    is cancelled and the cancellation leaves the block as TimeoutError. While
+    the consumer holds a chunk (inside ``paused``) nothing is cancelled, so
+    the cancellation never lands in the consumer's code; the stream stops as
+    soon as it resumes instead.
+    """
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.expired = False
+        self._waiting = True
+        self._task: Optional[asyncio.Task] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def __enter__(self) -> "_StreamDeadline":
+        loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._handle = loop.call_at(loop.time() + self.deadline - time.monotonic(), self._expire)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._handle.cancel()
+        if self.expired and exc_type is asyncio.CancelledError and self._task.uncancel() == 0:
+            raise asyncio.TimeoutError()
+        return False
+
+    def _expire(self):
+        self.expired = True
+        if self._waiting:
+            self._task.cancel()
+
+    @contextmanager
+    def paused(self):
+        self._waiting = False
+        try:
+            yield
+        finally:
+            self._waiting = True
+        if self.expired:
+            raise asyncio.TimeoutError()
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    AIMD concurrency limit: every successful call raises the limit by
+    ``1 / limit`` (about one per round of calls) and every overload signal
+    (429, 503, timeouts) multiplies it by ``backoff``. Callers over the limit
+    wait in FIFO order.
+    """
+
+    def __init__(self, initial: int = 16, min_limit: int = 1, max_limit: int = 64, backoff: float = 0.75):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: float):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release(None)
+            else:
+                waiter.cancel()
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            raise
+
+    def release(self, overloaded: Optional[bool]):
+        """Free a slot; ``overloaded`` is None when the call says nothing about upstream load"""
+        self.in_flight -= 1
+        if overloaded is True:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif overloaded is False:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive upstream failures and
+    rejects calls for ``reset_timeout`` seconds, then lets one probe call
+    through (half-open). A successful probe closes the circuit again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if self.state == "open" and now - self._opened_at < self.reset_timeout:
+            return False
+        # Half-open: one probe at a time, and a new one if a probe never reported back
+        if self.state == "half_open" and now - self._probe_started < self.reset_timeout:
+            return False
+        self.state = "half_open"
+        self._probe_started = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.state = "closed"
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class GuardedLLM(LLMBase):
+    """
+    Wraps the upstream LLM with an adaptive concurrency limit, retries and a
+    circuit breaker, bounded by the request deadline in ``request_deadline``
+    (or ``default_deadline`` seconds when none is set).
+
+    Failed attempts are retried with full-jitter exponential backoff, or after
+    the upstream's Retry-After, as long as no chunk has been yielded yet and
+    the deadline allows it. Client errors such as 400 are raised unchanged;
+    everything else ends in LLMUnavailableError.
+    """
+
+    def __init__(
+        self,
+        inner: LLMBase,
+        limit: Optional[AdaptiveConcurrencyLimit] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 5.0,
+        default_deadline: float = 60.0,
+        queue_timeout: float = 5.0,
+    ):
+        self.inner = inner
+        self.limit = limit or AdaptiveConcurrencyLimit()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.default_deadline = default_deadline
+        self.queue_timeout = queue_timeout
+        self.retries = 0
+        self.short_circuited = 0
+        self.deadline_exceeded = 0
+        self.limited = 0
+
+    async def startup(self):
+        await self.inner.startup()
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def _backoff(self, attempt: int, error: LLMUpstreamError) -> float:
+        """Honour Retry-After, otherwise full-jitter exponential backoff"""
+        if error.retry_after is not None:
+            return error.retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def chat(
+        self,
+        context: Dict[str, Any],
+        user_input: str,
+        temperature: float = 0.3,
+        max_tokens: int = 512,
+        stream: bool = False,
+    ) -> AsyncGenerator[str, None]:
+        deadline = request_deadline.get() or time.monotonic() + self.default_deadline
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise LLMUnavailableError("LLM upstream circuit is open")
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.deadline_exceeded += 1
+                raise LLMUnavailableError("Request deadline exceeded")
+            try:
+                await self.limit.acquire(min(remaining, self.queue_timeout))
+            except asyncio.TimeoutError:
+                self.limited += 1
+                raise LLMUnavailableError("LLM upstream concurrency limit reached")
+
+            yielded = False
+            overloaded: Optional[bool] = None
+            try:
+                chunks = self.inner.chat(context, user_input, temperature, max_tokens, stream)
+                with _StreamDeadline(deadline) as timer:
+                    try:
+                        async for chunk in chunks:
+                            yielded = True
+                            with timer.paused():
+                                yield chunk
+                    finally:
+                        await chunks.aclose()
+                overloaded = False
+                self.breaker.record_success()
+                return
+            except asyncio.TimeoutError:
+                # Deadlines come from clients, so they neither trip the breaker nor shrink the limit
+                self.deadline_exceeded += 1
+                raise LLMUnavailableError("Request deadline exceeded")
+            except LLMUpstreamError as e:
+                if not e.retryable:
+                    # The upstream is up but rejected the request
+                    self.breaker.record_success()
+                    raise
+                overloaded = e.overload
+                error = e
+            finally:
+                self.limit.release(overloaded)
+
+            attempt += 1
+            delay = self._backoff(attempt, error)
+            if yielded or attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                self.breaker.record_failure()
+                raise LLMUnavailableError(str(error)) from error
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "circuit_open": int(self.breaker.state != "closed"),
+            "consecutive_failures": self.breaker.failures,
+            "concurrency_limit": round(self.limit.limit, 2),
+            "in_flight": self.limit.in_flight,
+            "queued": self.limit.queued,
+            "retries": self.retries,
+            "short_circuited": self.short_circuited,
+            "deadline_exceeded": self.deadline_exceeded,
+            "limited": self.limited,
+        }
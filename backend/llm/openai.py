@@ -1,21 +1,98 @@
+import asyncio
+import importlib.util
+import logging
 import os
-from dotenv import load_dotenv
-import httpx
-from typing import Any, Dict, AsyncGenerator
+import time
+from typing import TYPE_CHECKING, Any, Dict, AsyncGenerator, Optional
 from .base import LLMBase
+from .errors import LLMUpstreamError, parse_retry_after
+from .sse import stream_deltas
+from .prompt import build_payload, context_prompt
+from metrics import LLM_IN_FLIGHT, LLM_TOKENS, LLM_UPSTREAM_RESPONSES, STAGE_LATENCY
 
-load_dotenv()
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 USE_FAKE = not OPENAI_API_KEY
 
-if not OPENAI_API_KEY:
-    print("WARNING: OPENAI_API_KEY not set. Using mock responses for development/testing.")
+OPENAI_API_URL = os.environ.get("OPENAI_API_URL", "https://api.openai.com/v1/chat/completions")
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o")
+FAKE_TOKEN_DELAY = float(os.environ.get("FAKE_TOKEN_DELAY", "0"))
 
-OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
-OPENAI_MODEL = "gpt-4o"
+# Connection pool and timeout settings for the shared upstream client
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_HTTP2 = os.environ.get("LLM_HTTP2", "1") == "1"
+LLM_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.environ.get("LLM_READ_TIMEOUT", "20"))
+LLM_STREAM_READ_TIMEOUT = float(os.environ.get("LLM_STREAM_READ_TIMEOUT", "60"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "64"))
+# Streamed deltas are merged until this many characters or milliseconds have accumulated
+LLM_STREAM_FLUSH_CHARS = int(os.environ.get("LLM_STREAM_FLUSH_CHARS", "256"))
+LLM_STREAM_FLUSH_MS = float(os.environ.get("LLM_STREAM_FLUSH_MS", "20"))
 
 class ChatGPT4oMiniLLM(LLMBase):
+    def __init__(
+        self,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY,
+        http2: bool = LLM_HTTP2,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        stream_read_timeout: float = LLM_STREAM_READ_TIMEOUT,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        flush_chars: int = LLM_STREAM_FLUSH_CHARS,
+        flush_interval: float = LLM_STREAM_FLUSH_MS / 1000,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        # HTTP/2 needs the optional h2 package (httpx[http2])
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.stream_read_timeout = stream_read_timeout
+        self.stream_timeout: Optional["httpx.Timeout"] = None
+        # Bounds in-flight upstream calls so bursts queue here instead of exhausting sockets
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional["httpx.AsyncClient"] = None
+        self.flush_chars = flush_chars
+        self.flush_interval = flush_interval
+        self.headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            # httpx (and h2) load with the first client, so the fake backend never imports them
+            import httpx
+
+            self.stream_timeout = httpx.Timeout(self.stream_read_timeout, connect=self.connect_timeout)
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                http2=self.http2,
+            )
+        return self._client
+
+    async def startup(self):
+        if USE_FAKE:
+            logger.warning("OPENAI_API_KEY not set. Using mock responses for development/testing.")
+        else:
+            self._get_client()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def chat(
         self,
         context: Dict[str, Any],
@@ -23,48 +100,80 @@ class ChatGPT4oMiniLLM(LLMBase):
         temperature: float = 0.3,
         max_tokens: int = 512,
         stream: bool = False,
+    ) -> AsyncGenerator[str, None]:
+        started = time.perf_counter()
+        first_token = True
+        LLM_IN_FLIGHT.inc()
+        try:
+            async for chunk in self._chat(context, user_input, temperature, max_tokens, stream):
+                if first_token:
+                    STAGE_LATENCY.observe(time.perf_counter() - started, "llm_first_token")
+                    first_token = False
+                yield chunk
+        finally:
+            LLM_IN_FLIGHT.dec()
+            STAGE_LATENCY.observe(time.perf_counter() - started, "llm_total")
+
+    @staticmethod
+    def _record_usage(usage: Optional[Dict[str, Any]]):
+        if usage:
+            LLM_TOKENS.inc("prompt", amount=usage.get("prompt_tokens", 0))
+            LLM_TOKENS.inc("completion", amount=usage.get("completion_tokens", 0))
+
+    async def _chat(
+        self,
+        context: Dict[str, Any],
+        user_input: str,
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
     ) -> AsyncGenerator[str, None]:
         if USE_FAKE:
             # Return a fake response for frontend testing
-            yield f"[MOCK] You said: {user_input}"
+            text = f"[MOCK] You said: {user_input}"
+            if not stream:
+                yield text
+                return
+            # Stream word by word so streaming clients can be exercised offline
+            for i, word in enumerate(text.split(" ")):
+                if FAKE_TOKEN_DELAY:
+                    await asyncio.sleep(FAKE_TOKEN_DELAY)
+                yield word if i == 0 else f" {word}"
             return
-        messages = []
-        for role in context.get("roles", []):
-            for k, v in role.items():
-                if k == "system":
-                    messages.append({"role": "system", "content": v})
-                elif k == "assistant":
-                    messages.append({"role": "assistant", "content": v})
-        messages.append({"role": "user", "content": user_input})
-
-        payload = {
-            "model": OPENAI_MODEL,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "stream": stream,
-        }
-
-        headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
-
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            if stream:
-                async with client.stream("POST", OPENAI_API_URL, json=payload, headers=headers) as response:
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            data = line[len("data: "):].strip()
-                            if data == "[DONE]":
-                                break
-                            try:
-                                chunk = httpx.Response(200, content=data).json()
-                                delta = chunk["choices"][0]["delta"].get("content", "")
-                                if delta:
-                                    yield delta
-                            except Exception:
-                                continue
-            else:
-                resp = await client.post(OPENAI_API_URL, json=payload, headers=headers)
-                resp.raise_for_status()
-                data = resp.json()
-                text = data["choices"][0]["message"]["content"]
-                yield text 
\ No newline at end of file
+        body = build_payload(context_prompt(context), user_input, OPENAI_MODEL, temperature, max_tokens, stream)
+
+        client = self._get_client()
+        import httpx
+        async with self._semaphore:
+            try:
+                if stream:
+                    async with client.stream(
+                        "POST", OPENAI_API_URL, content=body, headers=self.headers, timeout=self.stream_timeout
+                    ) as response:
+                        LLM_UPSTREAM_RESPONSES.inc(str(response.status_code))
+                        if response.status_code != 200:
+                            await response.aread()
+                            raise _upstream_error(response)
+                        async for text in stream_deltas(
+                            response.aiter_bytes(), self._record_usage, self.flush_chars, self.flush_interval
+                        ):
+                            yield text
+                else:
+                    resp = await client.post(OPENAI_API_URL, content=body, headers=self.headers)
+                    LLM_UPSTREAM_RESPONSES.inc(str(resp.status_code))
+                    if resp.status_code != 200:
+                        raise _upstream_error(resp)
+                    data = resp.json()
+                    self._record_usage(data.get("usage"))
+                    text = data["choices"][0]["message"]["content"]
+                    yield text
+            except httpx.TransportError as e:
+                raise LLMUpstreamError(None, f"LLM upstream request failed: {e!r}") from e
+
+
+def _upstream_error(response: "httpx.Response") -> LLMUpstreamError:
+    return LLMUpstreamError(
+        response.status_code,
+        f"LLM upstream returned {response.status_code}: {response.text[:200]}",
+        parse_retry_after(response.headers.get("retry-after")),
+    )
@@ -0,0 +1,92 @@
+"""
+Pre-compiled chat message prefixes and request payloads.
+
+A context's ``roles`` are turned into the upstream message list once and
+serialized once. Each request only serializes its user message and splices it
+onto the cached fragment, and identical contexts always produce byte-identical
+prefixes, which lets upstream prompt caching hit.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Tuple
+
+try:
+    import orjson
+
+    def _dumps(value: Any) -> bytes:
+        return orjson.dumps(value)
+except ImportError:  # pragma: no cover - orjson is optional
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# Context role keys forwarded to the upstream as chat messages
+MESSAGE_ROLES = ("system", "assistant")
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """
+    Immutable message prefix. ``fragment`` is the JSON array of the messages
+    without its closing bracket, ready for the user message to be appended.
+    """
+    messages: Tuple[Dict[str, str], ...]
+    fragment: bytes
+    digest: str
+
+    @classmethod
+    def of(cls, messages: Iterable[Dict[str, str]]) -> "CompiledPrompt":
+        return EMPTY_PROMPT.extend(messages)
+
+    def extend(self, messages: Iterable[Dict[str, str]]) -> "CompiledPrompt":
+        """A new prompt with ``messages`` appended; this prefix is reused, not re-serialized"""
+        messages = tuple(messages)
+        if not messages:
+            return self
+        added = b",".join(_dumps(message) for message in messages)
+        fragment = self.fragment + (b"," if self.messages else b"") + added
+        return CompiledPrompt(self.messages + messages, fragment, hashlib.sha256(fragment).hexdigest())
+
+
+EMPTY_PROMPT = CompiledPrompt((), b"[", hashlib.sha256(b"[").hexdigest())
+
+
+def compile_prompt(context: Dict[str, Any]) -> CompiledPrompt:
+    """Compile the ``roles`` of a context into a message prefix"""
+    return CompiledPrompt.of(
+        {"role": role, "content": content}
+        for entry in context.get("roles", [])
+        for role, content in entry.items()
+        if role in MESSAGE_ROLES
+    )
+
+
+def context_prompt(context: Dict[str, Any]) -> CompiledPrompt:
+    """The prompt compiled into ``context``, compiling it now if there is none"""
+    prompt = context.get("prompt")
+    return prompt if prompt is not None else compile_prompt(context)
+
+
+def build_payload(
+    prompt: CompiledPrompt,
+    user_input: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    stream: bool,
+) -> bytes:
+    """Serialized chat completion request: the cached prefix plus the user turn"""
+    separator = b"," if prompt.messages else b""
+    parts = [
+        b'{"model":', _dumps(model),
+        b',"messages":', prompt.fragment, separator, _dumps({"role": "user", "content": user_input}),
+        b'],"temperature":', _dumps(temperature),
+        b',"max_tokens":', _dumps(max_tokens),
+    ]
+    if stream:
+        # Ask for a final usage chunk so streamed tokens can be counted
+        parts.append(b',"stream":true,"stream_options":{"include_usage":true}}')
+    else:
+        parts.append(b',"stream":false}')
+    return b"".join(parts)
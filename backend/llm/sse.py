@@ -0,0 +1,189 @@
+"""
+Incremental parsing of OpenAI-style server-sent event streams.
+
+``SSEDecoder`` splits the raw byte stream into event payloads without
+building intermediate response objects, and ``stream_deltas`` decodes the
+payloads with orjson (when installed) and coalesces the content deltas into
+larger writes so downstream consumers see fewer, bigger chunks.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from .errors import LLMUpstreamError
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional
+    _loads = json.loads
+
+DONE = b"[DONE]"
+
+
+class SSEDecoder:
+    """
+    Incremental decoder of a text/event-stream byte stream into the data of
+    each event. Lines may end in LF or CRLF; comments and fields other than
+    ``data`` are ignored.
+    """
+
+    __slots__ = ("_buffer", "_data")
+
+    def __init__(self):
+        self._buffer = b""
+        self._data: List[bytes] = []
+
+    def _event(self) -> bytes:
+        data = self._data[0] if len(self._data) == 1 else b"\n".join(self._data)
+        self._data = []
+        return data
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Consume the next bytes and return the data of every event they complete"""
+        buffer = self._buffer + chunk if self._buffer else chunk
+        events = []
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line = buffer[start:end]
+            start = end + 1
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            if not line:
+                if self._data:
+                    events.append(self._event())
+            elif line.startswith(b"data:"):
+                self._data.append(line[6:] if line.startswith(b"data: ") else line[5:])
+        self._buffer = buffer[start:]
+        return events
+
+    def close(self) -> List[bytes]:
+        """Return the data of an event left unterminated at the end of the stream"""
+        if self._buffer:
+            self.feed(b"\n")
+        return [self._event()] if self._data else []
+
+
+def decode_delta(payload: bytes, on_usage: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+    """Content delta of one chat.completion.chunk payload"""
+    try:
+        chunk = _loads(payload)
+    except ValueError as e:
+        raise LLMUpstreamError(200, f"Malformed LLM stream chunk: {payload[:100]!r}") from e
+    if "error" in chunk:
+        raise LLMUpstreamError(200, f"LLM upstream stream error: {chunk['error']}")
+    usage = chunk.get("usage")
+    if usage and on_usage is not None:
+        on_usage(usage)
+    choices = chunk.get("choices")
+    if not choices:
+        return ""
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+async def stream_deltas(
+    byte_chunks: AsyncIterable[bytes],
+    on_usage: Optional[Callable[[Dict[str, Any]], None]] = None,
+    flush_chars: int = 256,
+    flush_interval: float = 0.02,
+) -> AsyncIterator[str]:
+    """
+    Yield the content of a chat completion stream, coalesced into writes of
+    at least ``flush_chars`` characters or at most ``flush_interval`` seconds
+    old. The first delta is yielded immediately to keep time to first byte
+    low; ``flush_interval <= 0`` yields the content of every network read.
+
+    Network reads happen on a reader task that hands bytes over through a
+    deque, so waiting for "more bytes or the flush deadline" needs only a
+    plain future and a timer handle instead of a task per read.
+    """
+    loop = asyncio.get_running_loop()
+    decoder = SSEDecoder()
+    reads: Deque[bytes] = deque()
+    state: Dict[str, Any] = {"eof": False, "error": None, "waiter": None}
+
+    def wake(*_):
+        waiter = state["waiter"]
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def reader():
+        try:
+            async for data in byte_chunks:
+                reads.append(data)
+                wake()
+        except Exception as e:
+            state["error"] = e
+        finally:
+            state["eof"] = True
+            wake()
+
+    reader_task = loop.create_task(reader())
+    pending: List[str] = []
+    pending_chars = 0
+    pending_since = 0.0
+    sent_any = False
+    finished = False
+    try:
+        while True:
+            if not reads:
+                if state["eof"]:
+                    break
+                waiter = state["waiter"] = loop.create_future()
+                timer = None
+                if pending and flush_interval > 0:
+                    timer = loop.call_at(pending_since + flush_interval, wake)
+                try:
+                    await waiter
+                finally:
+                    state["waiter"] = None
+                    if timer is not None:
+                        timer.cancel()
+                if not reads and pending and not state["eof"]:
+                    # Flush deadline reached before more bytes arrived
+                    yield "".join(pending)
+                    pending, pending_chars = [], 0
+                continue
+
+            for payload in decoder.feed(reads.popleft()):
+                if payload == DONE:
+                    finished = state["eof"] = True
+                    reads.clear()
+                    break
+                text = decode_delta(payload, on_usage)
+                if text:
+                    if not pending:
+                        pending_since = loop.time()
+                    pending.append(text)
+                    pending_chars += len(text)
+
+            if pending and (
+                not sent_any
+                or flush_interval <= 0
+                or pending_chars >= flush_chars
+                or loop.time() - pending_since >= flush_interval
+            ):
+                yield "".join(pending)
+                pending, pending_chars = [], 0
+                sent_any = True
+
+        if not finished:
+            if state["error"] is not None:
+                raise state["error"]
+            for payload in decoder.close():
+                if payload != DONE:
+                    text = decode_delta(payload, on_usage)
+                    if text:
+                        pending.append(text)
+        if pending:
+            yield "".join(pending)
+    finally:
+        reader_task.cancel()
+        # Let the reader unwind before the caller closes the response it reads from
+        await asyncio.gather(reader_task, return_exceptions=True)
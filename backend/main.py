@@ -1,44 +1,67 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from dotenv import load_dotenv
+# Before any module below reads its settings from the environment
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from config import get_context
+from contextlib import asynccontextmanager
+from config import CONTEXT_PATH, get_context, get_context_digest, add_reload_listener, reload_context
 from llm.openai import ChatGPT4oMiniLLM
+from llm.cache import CachedLLM, ResponseCache
+from llm.coalesce import CoalescingLLM
+from llm.errors import LLMUnavailableError, LLMUpstreamError
+from llm.guard import AdaptiveConcurrencyLimit, CircuitBreaker, GuardedLLM, set_request_deadline
+from llm.openai import LLM_MAX_CONCURRENCY
 from schemas import (
-    ChatRequest, ChatResponse, ProblemRequest, ProblemResponse
+    ChatRequest, ChatResponse, ProblemRequest, ProblemResponse, SolutionStatus, SolutionStep,
+    BatchChatRequest, BatchChatResult
 )
 from problem_manager import ProblemManager
+from snapshot import ActiveProblemSnapshot, JSONBody, dump_json, make_etag
+from intents import CommandRouter, SHOW_PROBLEM, LIST_PROBLEMS
+from catalog_index import PROBLEM_FIELDS
+from state_backend import create_state_backend
+from rate_limit import RateLimiter, create_rate_limit_backend, retry_after_header
+from catalog_loader import CatalogChange, CatalogWatcher
+from catalog_snapshot import load_catalog_snapshot
+from warmup import Warmup, WarmupMiddleware
+from compression import CompressionMiddleware, CompressionPolicy
+from responses import FastJSONResponse, json_body_response
+from sessions import SessionStore
+from submission_log import SubmissionRecorder
+from auth import JWKSProvider, JWKSUnavailableError, VerifiedTokenCache
+from evaluation_executor import EvaluationExecutor, EvaluationQueueFullError
+from prompts import EvaluationContextCache
+from metrics import REGISTRY, STAGE_LATENCY, AUTH_TOKEN_CACHE, LLM_FALLBACKS, MetricsMiddleware
+from streaming import wants_event_stream, stream_chunks, single_chunk, prepend_chunk
 import asyncio
+import gc
+import logging
 import re
-import httpx
 import os
 import time
 import json
-from typing import Dict, Any
-from jose import jwt
-import requests
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+
 
+logger = logging.getLogger(__name__)
 
 SUPABASE_PROJECT_ID = os.getenv("SUPABASE_PROJECT_ID", "jzkdmtsfxpdpgwymzxbq")
-JWKS_URL = f"https://{SUPABASE_PROJECT_ID}.supabase.co/auth/v1/certs"
-
-_JWKS_CACHE: Dict[str, Any] = {"keys": [], "fetched_at": 0}
-
-def _get_jwks() -> Dict[str, Any]:
-    now = int(time.time())
-    # Refresh every 10 minutes
-    if now - _JWKS_CACHE["fetched_at"] > 600 or not _JWKS_CACHE["keys"]:
-        resp = requests.get(JWKS_URL, timeout=5)
-        resp.raise_for_status()
-        _JWKS_CACHE["keys"] = resp.json().get("keys", [])
-        _JWKS_CACHE["fetched_at"] = now
-    return {"keys": _JWKS_CACHE["keys"]}
-
-def _get_public_key_from_kid(kid: str):
-    jwks = _get_jwks()
-    for key in jwks["keys"]:
-        if key.get("kid") == kid:
-            return jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
-    return None
+JWKS_URL = os.getenv("JWKS_URL", f"https://{SUPABASE_PROJECT_ID}.supabase.co/auth/v1/certs")
+
+jwks_provider = JWKSProvider(
+    JWKS_URL,
+    ttl=float(os.getenv("JWKS_TTL_SECONDS", "600")),
+    unknown_kid_interval=float(os.getenv("JWKS_UNKNOWN_KID_INTERVAL_SECONDS", "30")),
+    max_unknown_kids=int(os.getenv("JWKS_MAX_UNKNOWN_KIDS", "16")),
+)
+token_cache = VerifiedTokenCache(
+    max_size=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    max_ttl=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300")),
+)
+# Payloads verified against rotated-out keys must be verified again
+jwks_provider.add_rotation_listener(token_cache.clear)
 
 async def require_auth(request: Request):
     auth_header = request.headers.get("authorization") or request.headers.get("Authorization")
@@ -46,32 +69,111 @@ async def require_auth(request: Request):
         raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
     token = auth_header.split(" ", 1)[1]
 
+    cached = token_cache.get(token)
+    if cached is not None:
+        AUTH_TOKEN_CACHE.inc("hit")
+        request.state.user = cached
+        return cached
+    AUTH_TOKEN_CACHE.inc("miss")
+
+    # Imported on first use; the "auth" warmup step loads it ahead of the first request
+    from jose import jwt
     try:
         headers = jwt.get_unverified_header(token)
         kid = headers.get("kid")
         if not kid:
             raise HTTPException(status_code=401, detail="Invalid token header")
-        public_key = _get_public_key_from_kid(kid)
-        if not public_key:
-            # refresh and try again once
-            _JWKS_CACHE["fetched_at"] = 0
-            public_key = _get_public_key_from_kid(kid)
+        public_key = await jwks_provider.get_public_key(kid)
         if not public_key:
             raise HTTPException(status_code=401, detail="Unable to find signing key")
 
-        payload = jwt.decode(
-            token,
-            public_key,
-            algorithms=["RS256"],
-            audience=None,
-            options={"verify_aud": False}
-        )
+        with STAGE_LATENCY.time("jwt_decode"):
+            payload = jwt.decode(
+                token,
+                public_key,
+                algorithms=["RS256"],
+                audience=None,
+                options={"verify_aud": False}
+            )
+        token_cache.put(token, payload)
         request.state.user = payload
         return payload
+    except HTTPException:
+        raise
+    except JWKSUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"Signing keys unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
 
-app = FastAPI(title="AI Problem Solver - Single Problem Mode")
+async def enforce_rate_limit(user: Dict[str, Any], cost: int = 1):
+    """Answer 429 with Retry-After when the user or the whole service is over its request rate"""
+    if rate_limiter is None:
+        return
+    wait = await rate_limiter.check_async(str(user.get("sub", "")), cost)
+    if wait is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded, please slow down",
+            headers={"Retry-After": retry_after_header(wait)},
+        )
+
+async def rate_limited(user=Depends(require_auth)):
+    await enforce_rate_limit(user)
+
+async def client_deadline(request: Request):
+    """Bound upstream LLM calls by the client's X-Request-Timeout (seconds), capped by LLM_DEADLINE_SECONDS"""
+    timeout = LLM_DEADLINE_SECONDS
+    header = request.headers.get("x-request-timeout")
+    if header:
+        try:
+            timeout = min(timeout, float(header))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="X-Request-Timeout must be a number of seconds")
+        if timeout <= 0:
+            raise HTTPException(status_code=400, detail="X-Request-Timeout must be positive")
+    set_request_deadline(timeout)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    problem_state_backend.start(asyncio.get_running_loop())
+    await warmup.start()
+    if submission_recorder is not None:
+        await submission_recorder.start()
+    yield
+    await warmup.stop()
+    if submission_recorder is not None:
+        await submission_recorder.aclose()
+    if catalog_watcher is not None:
+        catalog_watcher.close()
+    problem_state_backend.close()
+    if rate_limiter is not None:
+        rate_limiter.close()
+    await llm.aclose()
+    await jwks_provider.aclose()
+    evaluation_executor.shutdown()
+
+# "blocking" finishes startup work before serving; "background" serves /health and /ready meanwhile
+warmup = Warmup(os.getenv("STARTUP_MODE", "blocking"))
+
+app = FastAPI(title="AI Problem Solver - Single Problem Mode", lifespan=lifespan)
+if warmup.mode == "background":
+    app.add_middleware(
+        WarmupMiddleware,
+        warmup=warmup,
+        exempt=("/health", "/ready", "/metrics"),
+        timeout=float(os.getenv("STARTUP_WAIT_SECONDS", "30")),
+    )
+
+# gzip (or brotli, when installed) for JSON and text bodies of at least COMPRESSION_MIN_BYTES
+compression: Optional[CompressionPolicy] = None
+if os.getenv("COMPRESSION_ENABLED", "1") == "1":
+    compression = CompressionPolicy(
+        minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+        gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5")),
+        streams=os.getenv("COMPRESSION_STREAMS", "1") == "1",
+    )
+    app.add_middleware(CompressionMiddleware, policy=compression)
 
 # Allow embedding in any site (adjust origins as needed)
 app.add_middleware(
@@ -81,106 +183,483 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# "memory" keeps the active problem per worker, "sqlite" shares it across workers
+problem_state_backend = create_state_backend(
+    os.getenv("PROBLEM_STATE_BACKEND", "memory"),
+    os.getenv("PROBLEM_STATE_PATH", "problem_state.db"),
+    poll_interval=float(os.getenv("PROBLEM_STATE_POLL_INTERVAL", "0.05")),
+)
+# The catalog is loaded by the "catalog" warmup step
+problem_manager = ProblemManager(problem_state_backend, autoload=False)
+
+# Retries, adaptive concurrency and a circuit breaker around the upstream API
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+guarded_llm = GuardedLLM(
+    ChatGPT4oMiniLLM(),
+    limit=AdaptiveConcurrencyLimit(
+        initial=int(os.getenv("LLM_INITIAL_CONCURRENCY", "16")),
+        max_limit=LLM_MAX_CONCURRENCY,
+    ),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+    ),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+    backoff_base=float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.2")),
+    backoff_max=float(os.getenv("LLM_RETRY_MAX_SECONDS", "5")),
+    default_deadline=LLM_DEADLINE_SECONDS,
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "5")),
+)
+# Identical concurrent requests share one upstream call
+coalescing_llm = CoalescingLLM(guarded_llm)
+llm = coalescing_llm
+response_cache: Optional[ResponseCache] = None
+if os.getenv("LLM_CACHE_ENABLED", "1") == "1":
+    response_cache = ResponseCache(
+        max_entries=int(os.getenv("LLM_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600")),
+        path=os.getenv("LLM_CACHE_PATH") or None,
+    )
+    llm = CachedLLM(llm, response_cache)
+    # Keys carry the problem id and the compiled prompt digest, so switching
+    # problems (or activating one at startup) needs no clear; entries for a
+    # replaced context file can never hit again and are dropped
+    add_reload_listener(lambda context: response_cache.clear())
+# Compiled prompt prefixes per context file and problem
+evaluation_contexts = EvaluationContextCache(max_entries=int(os.getenv("PROMPT_CACHE_SIZE", "256")))
+add_reload_listener(lambda context: evaluation_contexts.clear())
+evaluation_executor = EvaluationExecutor(
+    problem_manager,
+    mode=os.getenv("EVALUATION_BACKEND", "inline"),
+    workers=int(os.getenv("EVALUATION_WORKERS", "0")) or None,
+    max_pending=int(os.getenv("EVALUATION_MAX_PENDING", "256")),
+)
 
-llm = ChatGPT4oMiniLLM()
-problem_manager = ProblemManager()
+# "keyword" evaluates locally against reference steps, "llm" asks the model
+EVALUATION_MODE = os.getenv("EVALUATION_MODE", "keyword")
+
+session_store = SessionStore(
+    max_steps_per_user=int(os.getenv("SESSION_MAX_STEPS", "20")),
+    max_sessions=int(os.getenv("SESSION_MAX_USERS", "10000")),
+    max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024))),
+    idle_seconds=float(os.getenv("SESSION_IDLE_SECONDS", "3600")),
+)
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+# Token buckets per JWT subject and for the whole service; a rate of 0 turns a bucket off
+rate_limiter: Optional[RateLimiter] = None
+if os.getenv("RATE_LIMIT_ENABLED", "1") == "1":
+    rate_limiter = RateLimiter(
+        create_rate_limit_backend(
+            os.getenv("RATE_LIMIT_BACKEND", "memory"),
+            os.getenv("RATE_LIMIT_PATH", "rate_limits.db"),
+            idle_seconds=float(os.getenv("RATE_LIMIT_IDLE_SECONDS", "600")),
+            max_buckets=int(os.getenv("RATE_LIMIT_MAX_USERS", "100000")),
+        ),
+        user_rate=float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "60")) / 60,
+        user_burst=float(os.getenv("RATE_LIMIT_USER_BURST", "20")),
+        global_rate=float(os.getenv("RATE_LIMIT_GLOBAL_PER_SECOND", "0")),
+        global_burst=float(os.getenv("RATE_LIMIT_GLOBAL_BURST", "0")),
+        max_cost=BATCH_MAX_ITEMS,
+    )
+
+# Opt-in: records carry the raw user input
+submission_recorder: Optional[SubmissionRecorder] = None
+if os.getenv("SUBMISSION_LOG_ENABLED", "0") == "1":
+    submission_recorder = SubmissionRecorder(
+        os.getenv("SUBMISSION_LOG_PATH", "submissions.jsonl"),
+        batch_size=int(os.getenv("SUBMISSION_LOG_BATCH_SIZE", "256")),
+        flush_interval=float(os.getenv("SUBMISSION_LOG_FLUSH_SECONDS", "1.0")),
+        fsync=os.getenv("SUBMISSION_LOG_FSYNC", "interval"),
+        max_bytes=int(os.getenv("SUBMISSION_LOG_MAX_BYTES", str(100 * 1024 * 1024))),
+        backup_count=int(os.getenv("SUBMISSION_LOG_BACKUPS", "5")),
+    )
+
+def record_submission(
+    user_id: str,
+    problem_id: str,
+    user_input: str,
+    status: SolutionStatus,
+    started: float,
+    step_number: Optional[int] = None,
+    *,
+    mode: str,
+):
+    """Log an evaluation; ``mode`` names the evaluator that produced it, which differs from EVALUATION_MODE on fallbacks"""
+    if submission_recorder is not None:
+        submission_recorder.record(
+            user=user_id,
+            problem_id=problem_id,
+            input=user_input,
+            status=status.value,
+            step=step_number,
+            mode=mode,
+            latency_ms=round((time.perf_counter() - started) * 1000, 3),
+        )
 
-@app.post("/chat", response_model=ChatResponse)
+def llm_evaluation_context(user_id: str) -> Optional[Dict[str, Any]]:
+    """Build the LLM context for the active problem, or None if no problem is active"""
+    current_problem = problem_manager.get_current_problem()
+    if not current_problem:
+        return None
+    session = session_store.get(user_id, current_problem.id)
+    return evaluation_contexts.get(
+        get_context(),
+        get_context_digest(),
+        current_problem,
+        problem_manager.get_ai_flow_config(),
+        session.summary() if session and session.steps else None,
+    )
+
+async def record_llm_turn(chunks: AsyncIterator[str], user_id: str, problem_id: str, user_input: str) -> AsyncIterator[str]:
+    """Pass chunks through and add the turn to the user's session once the stream completes"""
+    started = time.perf_counter()
+    async for chunk in chunks:
+        yield chunk
+    session_store.record(user_id, problem_id, user_input, SolutionStatus.PENDING)
+    record_submission(user_id, problem_id, user_input, SolutionStatus.PENDING, started, mode="llm")
+
+async def evaluate_for_user(user_id: str, user_input: str) -> ChatResponse:
+    """Evaluate against the active problem, taking the user's completed steps into account"""
+    started = time.perf_counter()
+    current_problem = problem_manager.get_current_problem()
+    session = session_store.get(user_id, current_problem.id) if current_problem else None
+    response = await evaluate_or_429(user_input, session.approved_mask if session else 0)
+    if current_problem and response.matched_step:
+        status = response.step_statuses[response.matched_step - 1]
+        session = session_store.record(user_id, current_problem.id, user_input, status, response.matched_step)
+        response.completed_steps = session.approved_steps()
+        record_submission(user_id, current_problem.id, user_input, status, started, response.matched_step, mode="keyword")
+    return response
+
+REGISTRY.add_collector(evaluation_executor.stats, "evaluation_queue", "Evaluation backend queue counters")
+REGISTRY.add_collector(guarded_llm.stats, "llm_upstream", "LLM upstream guard state and counters")
+REGISTRY.add_collector(coalescing_llm.stats, "llm_coalescing", "Upstream LLM calls shared between identical requests")
+REGISTRY.add_collector(session_store.stats, "sessions", "Session store size and evictions")
+REGISTRY.add_collector(evaluation_contexts.stats, "prompt_cache", "Compiled evaluation prompt prefixes")
+REGISTRY.add_collector(lambda: {"size": len(token_cache)}, "auth_token_cache", "Verified-token cache entries")
+if response_cache is not None:
+    REGISTRY.add_collector(response_cache.stats, "llm_cache", "LLM response cache counters")
+if rate_limiter is not None:
+    REGISTRY.add_collector(rate_limiter.stats, "rate_limit", "Requests allowed and rejected by the per-user and global rate limits")
+if submission_recorder is not None:
+    REGISTRY.add_collector(submission_recorder.stats, "submission_log", "Submission log queue and write counters")
+if compression is not None:
+    REGISTRY.add_collector(compression.stats, "compression", "Compressed responses and bytes before and after compression")
+
+if evaluation_executor.mode == "process":
+    # Process workers hold a copy of the catalog taken when the pool started
+    problem_manager.add_catalog_listener(evaluation_executor.restart)
+
+def apply_catalog_change(change: CatalogChange):
+    if change.upserts or change.removed:
+        problem_manager.update_problems(change.upserts, change.removed, change.indexes)
+    if change.context_changed:
+        reload_context()
+
+# Problems from PROBLEMS_DIR are loaded on top of problems_config.py and hot reloaded
+PROBLEMS_DIR = os.getenv("PROBLEMS_DIR")
+catalog_watcher: Optional[CatalogWatcher] = None
+if PROBLEMS_DIR:
+    catalog_watcher = CatalogWatcher(
+        PROBLEMS_DIR,
+        apply_catalog_change,
+        context_path=CONTEXT_PATH,
+        poll_interval=float(os.getenv("CATALOG_POLL_INTERVAL", "1.0")),
+    )
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH")
+
+def load_catalog():
+    """Load the problem catalog from a prebuilt snapshot if one matches, from source otherwise"""
+    snapshot = load_catalog_snapshot(CATALOG_SNAPSHOT_PATH, PROBLEMS_DIR) if CATALOG_SNAPSHOT_PATH else None
+    if snapshot is None:
+        problem_manager.load()
+    else:
+        problem_manager.load(snapshot["problems"], snapshot["indexes"], snapshot["catalog"], snapshot["ai_flow_config"])
+        if catalog_watcher is not None and snapshot["watcher"]:
+            catalog_watcher.restore_state(snapshot["watcher"])
+    if catalog_watcher is not None:
+        # Only files changed since the snapshot (or every file, without one) are read
+        apply_catalog_change(catalog_watcher.scan())
+
+async def start_catalog_watcher():
+    catalog_watcher.start(asyncio.get_running_loop())
+
+async def prefetch_signing_keys():
+    try:
+        await jwks_provider.refresh()
+    except Exception as e:
+        # Not fatal: keys are fetched again on the first authenticated request
+        logger.warning("Could not prefetch signing keys: %s", e)
+
+def load_auth_backend():
+    # jose and its cryptography backends are slow to import; do it before the first token arrives
+    import jose.jwt
+
+warmup.add_step("catalog", load_catalog)
+if catalog_watcher is not None:
+    warmup.add_step("catalog_watcher", start_catalog_watcher)
+warmup.add_step("context", get_context_digest)
+warmup.add_step("auth", load_auth_backend)
+if os.getenv("JWKS_PREFETCH", "1") == "1":
+    warmup.add_step("jwks", prefetch_signing_keys)
+if EVALUATION_MODE == "llm":
+    # The upstream client (TLS setup included) is only opened when it will be used
+    warmup.add_step("llm", llm.startup)
+if evaluation_executor.mode != "inline":
+    warmup.add_step("evaluation_workers", evaluation_executor.warm_up)
+# Startup objects (mostly the catalog) live for the whole process: keep the cyclic GC from rescanning them
+warmup.add_step("gc_freeze", gc.freeze)
+
+PROBLEMS_PAGE_MAX = 200
+PROBLEM_LIST_CHAT_LIMIT = 20
+
+def render_problem_list(snapshot: ActiveProblemSnapshot) -> str:
+    """Chat reply listing the first page of the catalog"""
+    ids, _ = problem_manager.catalog.query(limit=PROBLEM_LIST_CHAT_LIMIT)
+    problem_list = "\n".join([f"- {title} (ID: {problem_id})" for problem_id, title in problem_manager.catalog.titles(ids)])
+    remaining = len(problem_manager.catalog) - len(ids)
+    if remaining > 0:
+        problem_list += f"\n...and {remaining} more (browse them with GET /problems)"
+    return f"Available problems:\n{problem_list}\n\nTo change the active problem, an admin should use the /admin/set-problem endpoint."
+
+def render_current_problem(snapshot: ActiveProblemSnapshot) -> str:
+    current_problem = snapshot.info
+    if not current_problem:
+        return "No active problem is currently set."
+    return f"🎯 Current Problem: {current_problem['title']}\n\n📝 {current_problem['description']}\n\n📊 Difficulty: {current_problem['difficulty_level']}\n🏷️ Category: {current_problem['category']}"
+
+# Chat commands answered without evaluation; replies are cached per snapshot version
+command_router = CommandRouter()
+command_router.add_command(SHOW_PROBLEM, ["show problem", "current problem", "what problem", "problem info"], render_current_problem)
+command_router.add_command(LIST_PROBLEMS, ["available problems", "list problems", "all problems"], render_problem_list)
+
+async def evaluate_or_429(user_input: str, completed_mask: int = 0) -> ChatResponse:
+    """Evaluate on the configured backend, shedding load when the queue is full"""
+    try:
+        return await evaluation_executor.evaluate(user_input, completed_mask)
+    except EvaluationQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+async def evaluate_many_or_429(items: List[Tuple[str, str]], completed_masks: Optional[List[int]] = None) -> List[Optional[ChatResponse]]:
+    """Batch counterpart of evaluate_or_429"""
+    try:
+        return await evaluation_executor.evaluate_many(items, completed_masks)
+    except EvaluationQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+@app.post("/chat", response_model=ChatResponse, dependencies=[Depends(rate_limited), Depends(client_deadline)])
 async def chat_endpoint(request: ChatRequest, user=Depends(require_auth)):
     """
     Enhanced chat endpoint that evaluates solutions against the current problem.
     """
     user_input = request.user_input.strip()
     
-    # Check if user wants to see the current problem
-    if any(keyword in user_input.lower() for keyword in ["show problem", "current problem", "what problem", "problem info"]):
-        current_problem = problem_manager.get_active_problem_info()
-        if current_problem:
-            problem_info = f"🎯 Current Problem: {current_problem['title']}\n\n📝 {current_problem['description']}\n\n📊 Difficulty: {current_problem['difficulty_level']}\n🏷️ Category: {current_problem['category']}"
-            return ChatResponse(
-                response=problem_info,
-                solution_evaluated=False
-            )
-        else:
-            return ChatResponse(
-                response="No active problem is currently set.",
-                solution_evaluated=False
-            )
-    
-    # Check if user wants to see available problems (admin function)
-    if any(keyword in user_input.lower() for keyword in ["available problems", "list problems", "all problems"]):
-        available_problems = problem_manager.get_available_problems()
-        problem_list = "\n".join([f"- {p.title} (ID: {p.id})" for p in available_problems])
-        
+    # Commands such as "show problem" or "list problems"
+    command_reply = command_router.reply(user_input, problem_manager.snapshot)
+    if command_reply is not None:
         return ChatResponse(
-            response=f"Available problems:\n{problem_list}\n\nTo change the active problem, an admin should use the /admin/set-problem endpoint.",
+            response=command_reply,
             solution_evaluated=False
         )
     
+    user_id = str(user.get("sub", ""))
+    if EVALUATION_MODE == "llm":
+        context = llm_evaluation_context(user_id)
+        if context is None:
+            return ChatResponse(
+                response="No active problem set. Please contact an administrator.",
+                solution_evaluated=False
+            )
+        started = time.perf_counter()
+        try:
+            chunks = [chunk async for chunk in llm.chat(context, user_input)]
+        except LLMUnavailableError:
+            LLM_FALLBACKS.inc()
+            return await evaluate_for_user(user_id, user_input)
+        except LLMUpstreamError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        session_store.record(user_id, context["problem_id"], user_input, SolutionStatus.PENDING)
+        record_submission(user_id, context["problem_id"], user_input, SolutionStatus.PENDING, started, mode="llm")
+        return ChatResponse(response="".join(chunks), solution_evaluated=True)
+    
     # Handle solution evaluation
     try:
-        response = problem_manager.evaluate_solution(user_input)
+        response = await evaluate_for_user(user_id, user_input)
         return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/chat/stream")
-async def chat_stream_endpoint(request: ChatRequest, user=Depends(require_auth)):
+@app.post("/chat/stream", dependencies=[Depends(rate_limited), Depends(client_deadline)])
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request, user=Depends(require_auth)):
     """
     Streaming endpoint for chat with solution evaluation.
+    Sends text/event-stream frames when the client accepts them, plain text otherwise.
     """
     user_input = request.user_input.strip()
+    event_stream = wants_event_stream(http_request)
     
-    # Check if user wants to see the current problem
-    if any(keyword in user_input.lower() for keyword in ["show problem", "current problem", "what problem", "problem info"]):
-        current_problem = problem_manager.get_active_problem_info()
-        if current_problem:
-            problem_info = f"🎯 Current Problem: {current_problem['title']}\n\n📝 {current_problem['description']}\n\n📊 Difficulty: {current_problem['difficulty_level']}\n🏷️ Category: {current_problem['category']}"
-            async def problem_stream():
-                yield problem_info
-            return StreamingResponse(problem_stream(), media_type="text/plain")
-        else:
-            async def no_problem_stream():
-                yield "No active problem is currently set."
-            return StreamingResponse(no_problem_stream(), media_type="text/plain")
+    # Commands such as "show problem" or "list problems"
+    command_reply = command_router.reply(user_input, problem_manager.snapshot)
+    if command_reply is not None:
+        return stream_chunks(single_chunk(command_reply), event_stream)
     
-    # Check if user wants to see available problems
-    if any(keyword in user_input.lower() for keyword in ["available problems", "list problems", "all problems"]):
-        available_problems = problem_manager.get_available_problems()
-        problem_list = "\n".join([f"- {p.title} (ID: {p.id})" for p in available_problems])
-        
-        async def problems_stream():
-            yield f"Available problems:\n{problem_list}\n\nTo change the active problem, an admin should use the /admin/set-problem endpoint."
-        return StreamingResponse(problems_stream(), media_type="text/plain")
+    # Stream the LLM evaluation token by token
+    user_id = str(user.get("sub", ""))
+    if EVALUATION_MODE == "llm":
+        context = llm_evaluation_context(user_id)
+        if context is None:
+            return stream_chunks(single_chunk("No active problem set. Please contact an administrator."), event_stream)
+        chunks = llm.chat(context, user_input, stream=True)
+        # Wait for the first chunk so an unavailable upstream can still fall back
+        try:
+            chunks = prepend_chunk(await chunks.__anext__(), chunks)
+        except StopAsyncIteration:
+            pass
+        except LLMUnavailableError:
+            LLM_FALLBACKS.inc()
+            response = await evaluate_for_user(user_id, user_input)
+            return stream_chunks(single_chunk(response.response), event_stream)
+        except LLMUpstreamError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        return stream_chunks(record_llm_turn(chunks, user_id, context["problem_id"], user_input), event_stream)
     
     # Handle solution evaluation with streaming feedback
     try:
-        response = problem_manager.evaluate_solution(user_input)
+        response = await evaluate_for_user(user_id, user_input)
+        return stream_chunks(single_chunk(response.response), event_stream)
         
-        async def solution_stream():
-            yield response.response
+    except HTTPException:
+        raise
+    except Exception as e:
+        return stream_chunks(single_chunk(f"[ERROR] {str(e)}"), event_stream)
+
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
+def batch_line(index: int, item_id: Optional[str], problem_id: Optional[str], result: Optional[ChatResponse] = None, error: Optional[str] = None) -> bytes:
+    line = BatchChatResult(index=index, id=item_id, problem_id=problem_id, result=result, error=error)
+    return line.model_dump_json().encode() + b"\n"
+
+@app.post("/chat/batch", dependencies=[Depends(client_deadline)])
+async def chat_batch_endpoint(request: BatchChatRequest, user=Depends(require_auth)):
+    """
+    Evaluate many submissions with a single authenticated request.
+    Results stream back as NDJSON, one line per item as it finishes. Keyword
+    scoring runs as one vectorized pass per problem; LLM evaluations run with
+    bounded parallelism and fall back to the keyword result if the upstream
+    is unavailable.
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_ITEMS} items")
+    # Every item counts as one request
+    await enforce_rate_limit(user, len(request.items))
+    current_problem = problem_manager.get_current_problem()
+    default_problem_id = request.problem_id or (current_problem.id if current_problem else None)
+    items = [(item.problem_id or default_problem_id, item.user_input.strip()) for item in request.items]
+    item_ids = [item.id for item in request.items]
+    user_id = str(user.get("sub", ""))
+    started = time.perf_counter()
+    # Items for the active problem rank the user's completed steps like /chat does
+    session = session_store.get(user_id, current_problem.id) if current_problem else None
+    completed_masks = [session.approved_mask if session and problem_id == session.problem_id else 0 for problem_id, _ in items]
+    # Scored before the response starts so a full queue still answers 429
+    keyword_results = await evaluate_many_or_429(items, completed_masks)
+    
+    def finish(index: int, result: Optional[ChatResponse], error: Optional[str] = None, mode: str = "keyword") -> bytes:
+        problem_id, user_input = items[index]
+        if result is not None:
+            status = result.step_statuses[result.matched_step - 1] if result.matched_step else SolutionStatus.PENDING
+            record_submission(user_id, problem_id, user_input, status, started, result.matched_step, mode=mode)
+        elif error is None:
+            error = f"Problem {problem_id} not found"
+        return batch_line(index, item_ids[index], problem_id, result, error)
+    
+    async def keyword_lines() -> AsyncIterator[bytes]:
+        for index, result in enumerate(keyword_results):
+            yield finish(index, result)
+    
+    async def llm_lines() -> AsyncIterator[bytes]:
+        semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+        contexts: Dict[str, Dict[str, Any]] = {}
         
-        return StreamingResponse(solution_stream(), media_type="text/plain")
+        async def evaluate_item(index: int) -> Tuple[int, Optional[ChatResponse], Optional[str], str]:
+            problem_id, user_input = items[index]
+            if keyword_results[index] is None:
+                return index, None, None, "keyword"
+            if problem_id not in contexts:
+                contexts[problem_id] = evaluation_contexts.get(
+                    get_context(),
+                    get_context_digest(),
+                    problem_manager.problems[problem_id],
+                    problem_manager.get_ai_flow_config(),
+                )
+            async with semaphore:
+                try:
+                    chunks = [chunk async for chunk in llm.chat(contexts[problem_id], user_input)]
+                except LLMUnavailableError:
+                    LLM_FALLBACKS.inc()
+                    return index, keyword_results[index], None, "keyword"
+                except LLMUpstreamError as e:
+                    return index, None, str(e), "llm"
+            return index, ChatResponse(response="".join(chunks), solution_evaluated=True), None, "llm"
         
-    except Exception as e:
-        async def error_stream():
-            yield f"[ERROR] {str(e)}"
-        return StreamingResponse(error_stream(), media_type="text/plain")
+        tasks = [asyncio.ensure_future(evaluate_item(index)) for index in range(len(items))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield finish(*await next_done)
+        finally:
+            # The client went away or the stream failed; stop outstanding upstream calls
+            for task in tasks:
+                task.cancel()
+    
+    lines = llm_lines() if EVALUATION_MODE == "llm" else keyword_lines()
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.get("/session", response_model=List[SolutionStep])
+async def get_session(user=Depends(require_auth)):
+    """Get the caller's recent solution steps for the active problem"""
+    current_problem = problem_manager.get_current_problem()
+    if current_problem is None:
+        return []
+    return session_store.history(str(user.get("sub", "")), current_problem.id)
 
 @app.get("/problem/current")
-async def get_current_problem():
+async def get_current_problem(request: Request):
     """Get information about the currently active problem"""
-    current_problem = problem_manager.get_active_problem_info()
-    if not current_problem:
+    snapshot = problem_manager.snapshot
+    if not snapshot.current_problem:
         raise HTTPException(status_code=404, detail="No active problem found")
     
-    return current_problem
+    return json_body_response(request, snapshot.current_problem, compression)
 
 @app.get("/problems")
-async def get_available_problems():
-    """Get list of available problems (admin function)"""
-    problems = problem_manager.get_available_problems()
-    return {"problems": [problem.dict() for problem in problems]}
+async def get_available_problems(
+    request: Request,
+    category: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Words that must all appear in the title or description"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=PROBLEMS_PAGE_MAX),
+    fields: Optional[str] = Query(None, description="Comma-separated problem fields to include"),
+):
+    """Get a page of available problems (admin function)"""
+    projection = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    if projection:
+        unknown = set(projection) - set(PROBLEM_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    try:
+        ids, next_cursor = problem_manager.catalog.query(category, difficulty, q, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    body = b'{"problems":' + problem_manager.catalog.render(ids, projection) + b',"next_cursor":' + dump_json(next_cursor) + b"}"
+    return json_body_response(request, JSONBody(body=body, etag=make_etag(body)), compression)
 
 @app.post("/admin/set-problem")
 async def set_active_problem(request: ProblemRequest):
@@ -197,13 +676,84 @@ async def set_active_problem(request: ProblemRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/ai-flow/config")
-async def get_ai_flow_config():
+async def get_ai_flow_config(request: Request):
     """Get AI flow configuration for the current problem"""
-    current_problem = problem_manager.get_current_problem()
-    if not current_problem:
+    snapshot = problem_manager.snapshot
+    if not snapshot.ai_flow_config:
         raise HTTPException(status_code=404, detail="No active problem found")
     
-    return {
-        "global_config": problem_manager.get_ai_flow_config(),
-        "problem_specific": current_problem.ai_flow.dict() if current_problem.ai_flow else None
-    } 
\ No newline at end of file
+    return json_body_response(request, snapshot.ai_flow_config, compression)
+
+@app.get("/admin/evaluation-queue")
+async def get_evaluation_queue_stats():
+    """Get evaluation backend queue depth and throughput counters"""
+    return FastJSONResponse(evaluation_executor.stats())
+
+
+@app.get("/admin/llm-cache")
+async def get_llm_cache_stats():
+    """Get LLM response cache hit/miss counters"""
+    if response_cache is None:
+        return FastJSONResponse({"enabled": False})
+    return FastJSONResponse({"enabled": True, **response_cache.stats()})
+
+
+@app.get("/admin/llm-upstream")
+async def get_llm_upstream_stats():
+    """Get circuit breaker state, adaptive concurrency limit and retry counters"""
+    return FastJSONResponse(guarded_llm.stats())
+
+
+@app.get("/admin/llm-coalescing")
+async def get_llm_coalescing_stats():
+    """Get counters for upstream LLM calls shared between identical requests"""
+    return FastJSONResponse(coalescing_llm.stats())
+
+
+@app.get("/admin/rate-limits")
+async def get_rate_limit_stats():
+    """Get counters of requests allowed and rejected by the rate limiter"""
+    if rate_limiter is None:
+        return FastJSONResponse({"enabled": False})
+    return FastJSONResponse({"enabled": True, **rate_limiter.stats()})
+
+
+@app.get("/admin/sessions")
+async def get_session_stats():
+    """Get session store size and eviction counters"""
+    return FastJSONResponse(session_store.stats())
+
+
+@app.get("/admin/submission-log")
+async def get_submission_log_stats():
+    """Get submission log queue and write counters"""
+    if submission_recorder is None:
+        return FastJSONResponse({"enabled": False})
+    return FastJSONResponse({"enabled": True, **submission_recorder.stats()})
+
+
+@app.get("/admin/compression")
+async def get_compression_stats():
+    """Get response compression settings and counters"""
+    if compression is None:
+        return FastJSONResponse({"enabled": False})
+    return FastJSONResponse({"enabled": True, **compression.stats()})
+
+
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving, possibly still warming up"""
+    return FastJSONResponse({"status": "ok"})
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once every startup step has finished, 503 before that"""
+    status = warmup.status()
+    return FastJSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of this worker's counters and latency histograms"""
+    return PlainTextResponse(REGISTRY.expose(), media_type="text/plain; version=0.0.4")
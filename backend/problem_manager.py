@@ -1,21 +1,70 @@
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 from schemas import (
     ProblemFramework, SolutionStep, 
     SolutionStatus, ChatResponse, AIFlowConfig
 )
-from problems_config import AI_FLOW_CONFIG
+from keyword_index import ProblemIndex, extract_keywords
+from snapshot import ActiveProblemSnapshot, build_snapshot
+from catalog_index import CatalogIndex
+from state_backend import StateBackend, InProcessStateBackend
+from metrics import STAGE_LATENCY
 
 class ProblemManager:
-    def __init__(self):
+    def __init__(self, state_backend: Optional[StateBackend] = None, autoload: bool = True):
+        self.state_backend = state_backend or InProcessStateBackend()
         self.problems: Dict[str, ProblemFramework] = {}
-        self.current_problem: Optional[ProblemFramework] = None
-        self.load_default_problems()
-        # Set the first problem as active by default
-        if self.problems:
+        self.indexes: Dict[str, ProblemIndex] = {}
+        self._listeners: List[Callable[[ProblemFramework], None]] = []
+        self._catalog_listeners: List[Callable[[], None]] = []
+        self.catalog = CatalogIndex()
+        self.ai_flow_config: Dict = {}
+        self.loaded = False
+        # Readers take self.snapshot once; writers publish a new one by reference swap
+        self.snapshot: ActiveProblemSnapshot = build_snapshot(0, None, None, self.ai_flow_config)
+        self.state_backend.subscribe(self._on_state_change)
+        if autoload:
+            self.load()
+    
+    def load(
+        self,
+        problems: Optional[Dict[str, ProblemFramework]] = None,
+        indexes: Optional[Dict[str, ProblemIndex]] = None,
+        catalog: Optional[CatalogIndex] = None,
+        ai_flow_config: Optional[Dict] = None,
+    ):
+        """
+        Load the catalog, from problems_config.py or from prebuilt problems,
+        indexes and catalog index, and activate the stored or first problem.
+        """
+        if problems is None:
+            from problems_config import AI_FLOW_CONFIG
+            self.ai_flow_config = AI_FLOW_CONFIG
+            self.load_default_problems()
+        else:
+            self.ai_flow_config = ai_flow_config or {}
+            self.problems = dict(problems)
+            self.indexes = dict(indexes or {})
+            self.catalog = catalog or CatalogIndex(self.problems.values())
+            self._publish(self.current_problem)
+        # Follow the shared active problem, or set the first problem as active by default
+        stored_problem_id = self.state_backend.get_active_problem_id()
+        if stored_problem_id in self.problems:
+            self._activate(stored_problem_id)
+        elif self.problems:
             first_problem_id = list(self.problems.keys())[0]
             self.set_active_problem(first_problem_id)
+        self.loaded = True
+    
+    def __getstate__(self):
+        # Listeners and the shared state backend are bound to the owning process;
+        # worker copies start without listeners and switch problems locally
+        state = self.__dict__.copy()
+        state["_listeners"] = []
+        state["_catalog_listeners"] = []
+        state["state_backend"] = InProcessStateBackend()
+        return state
     
     def load_default_problems(self):
         """Load default problem frameworks"""
@@ -23,55 +72,167 @@ class ProblemManager:
         
         for problem in ALL_PROBLEMS:
             self.problems[problem.id] = problem
+            self.indexes[problem.id] = ProblemIndex(problem)
+            self.catalog.add(problem)
+        self._publish(self.current_problem)
+    
+    def update_problems(
+        self,
+        upserts: Dict[str, ProblemFramework],
+        removed: Iterable[str] = (),
+        indexes: Optional[Dict[str, ProblemIndex]] = None,
+    ):
+        """
+        Add, replace and remove problems, rebuilding only the affected indexes.
+        Requests holding the previous snapshot finish against it undisturbed.
+        """
+        indexes = indexes or {}
+        for problem_id in removed:
+            self.problems.pop(problem_id, None)
+            self.indexes.pop(problem_id, None)
+            self.catalog.remove(problem_id)
+        for problem_id, problem in upserts.items():
+            self.problems[problem_id] = problem
+            self.indexes[problem_id] = indexes.get(problem_id) or ProblemIndex(problem)
+            self.catalog.add(problem)
+        
+        # The active problem keeps being served even if it was removed from the catalog
+        current = self.current_problem
+        stored_problem_id = self.state_backend.get_active_problem_id()
+        if stored_problem_id in upserts and (current is None or current.id != stored_problem_id):
+            # The shared active problem may only exist in the newly loaded files
+            self._activate(stored_problem_id)
+        elif current is not None and current.id in upserts:
+            self._activate(current.id)
+        else:
+            self._publish(current)
+        for listener in self._catalog_listeners:
+            listener()
+    
+    def add_catalog_listener(self, listener: Callable[[], None]):
+        """Register a callback invoked after the problem catalog changes"""
+        self._catalog_listeners.append(listener)
+    
+    @property
+    def current_problem(self) -> Optional[ProblemFramework]:
+        return self.snapshot.problem
+    
+    def _publish(self, problem: Optional[ProblemFramework]) -> ActiveProblemSnapshot:
+        """Build a new snapshot for ``problem`` and publish it with one reference swap"""
+        snapshot = build_snapshot(
+            self.snapshot.version + 1,
+            problem,
+            self.indexes.get(problem.id) if problem else None,
+            self.ai_flow_config,
+        )
+        self.snapshot = snapshot
+        return snapshot
     
     def set_active_problem(self, problem_id: str) -> ProblemFramework:
         """Set a problem as the active global problem"""
         if problem_id not in self.problems:
             raise ValueError(f"Problem {problem_id} not found")
         
-        self.current_problem = self.problems[problem_id]
-        return self.current_problem
+        self.state_backend.set_active_problem_id(problem_id)
+        return self._activate(problem_id)
+    
+    def _on_state_change(self, problem_id: str):
+        """Apply an active problem change made by another worker"""
+        current = self.current_problem
+        if problem_id in self.problems and (current is None or current.id != problem_id):
+            self._activate(problem_id)
+    
+    def _activate(self, problem_id: str) -> ProblemFramework:
+        if problem_id not in self.indexes:
+            self.indexes[problem_id] = ProblemIndex(self.problems[problem_id])
+        problem = self._publish(self.problems[problem_id]).problem
+        for listener in self._listeners:
+            listener(problem)
+        return problem
+    
+    def add_listener(self, listener: Callable[[ProblemFramework], None]):
+        """Register a callback invoked with the new problem whenever the active problem changes"""
+        self._listeners.append(listener)
     
     def get_current_problem(self) -> Optional[ProblemFramework]:
         """Get the currently active problem"""
         return self.current_problem
     
-    def evaluate_solution(self, user_input: str) -> ChatResponse:
-        """Evaluate a user's proposed solution step against the current problem"""
-        if not self.current_problem:
+    def evaluate_solution(self, user_input: str, completed_mask: int = 0) -> ChatResponse:
+        """
+        Evaluate a user's proposed solution step against the current problem.
+        ``completed_mask`` has bit i set for reference steps the user already completed.
+        """
+        snapshot = self.snapshot
+        if not snapshot.problem:
             return ChatResponse(
                 response="No active problem set. Please contact an administrator.",
                 solution_evaluated=False
             )
         
-        # For now, we'll evaluate against the first step
-        # In a real system, you might want to determine which step the user is addressing
-        reference_step = self.current_problem.reference_steps[0]
-        
-        # Evaluate the solution using AI logic with flow configuration
-        evaluation_result = self._evaluate_step_logic(user_input, reference_step)
+        # Score the input against every reference step and give feedback
+        # on the step the user is most likely addressing
+        with STAGE_LATENCY.time("keyword_match"):
+            scores = snapshot.index.score(user_input, completed_mask)
+        evaluation_result = self._evaluate_step_logic(
+            snapshot.problem, scores.best_step, scores.statuses[scores.best_step]
+        )
         
         # Generate response with AI flow suggestions
         response = ChatResponse(
             response=evaluation_result["feedback"],
-            solution_evaluated=True
+            solution_evaluated=True,
+            matched_step=scores.best_step + 1,
+            step_statuses=scores.statuses
         )
         
         return response
     
-    def _evaluate_step_logic(self, user_input: str, reference_step: str) -> Dict[str, any]:
-        """Evaluate a solution step using logic and reference framework with AI flow"""
-        user_input_lower = user_input.lower()
+    def evaluate_many(
+        self, items: Sequence[Tuple[str, str]], completed_masks: Optional[Sequence[int]] = None
+    ) -> List[Optional[ChatResponse]]:
+        """
+        Keyword-evaluate ``(problem_id, user_input)`` pairs, scoring the inputs
+        of each problem in one vectorized pass. ``completed_masks`` holds each
+        item's completed steps, as for ``evaluate_solution``. Items naming an
+        unknown problem get None.
+        """
+        groups: Dict[str, List[int]] = {}
+        for position, (problem_id, _) in enumerate(items):
+            if problem_id in self.problems:
+                groups.setdefault(problem_id, []).append(position)
         
-        # Check if user input contains relevant keywords from reference step
-        relevant_keywords = self._extract_keywords(reference_step)
-        keyword_matches = sum(1 for keyword in relevant_keywords if keyword in user_input_lower)
+        results: List[Optional[ChatResponse]] = [None] * len(items)
+        for problem_id, positions in groups.items():
+            problem = self.problems[problem_id]
+            index = self.indexes.get(problem_id)
+            if index is None:
+                index = self.indexes[problem_id] = ProblemIndex(problem)
+            with STAGE_LATENCY.time("keyword_match"):
+                batch_scores = index.score_many(
+                    [items[position][1] for position in positions],
+                    [completed_masks[position] for position in positions] if completed_masks else None,
+                )
+            for position, scores in zip(positions, batch_scores):
+                evaluation_result = self._evaluate_step_logic(
+                    problem, scores.best_step, scores.statuses[scores.best_step]
+                )
+                results[position] = ChatResponse(
+                    response=evaluation_result["feedback"],
+                    solution_evaluated=True,
+                    matched_step=scores.best_step + 1,
+                    step_statuses=scores.statuses
+                )
+        return results
+    
+    def _evaluate_step_logic(self, problem: ProblemFramework, step_index: int, status: SolutionStatus) -> Dict[str, any]:
+        """Build feedback for a scored solution step using the reference framework with AI flow"""
+        reference_step = problem.reference_steps[step_index]
         
-        # Get AI flow configuration for current problem
-        ai_flow = self.current_problem.ai_flow if self.current_problem else None
+        # Get AI flow configuration for the problem being evaluated
+        ai_flow = problem.ai_flow
         
-        if keyword_matches >= len(relevant_keywords) * 0.6:  # 60% keyword match threshold
-            status = SolutionStatus.APPROVED
+        if status == SolutionStatus.APPROVED:
             if ai_flow and ai_flow.suggestions:
                 # Use AI flow suggestions for positive feedback
                 suggestion = self._get_random_suggestion(ai_flow.suggestions)
@@ -79,8 +240,7 @@ class ProblemManager:
             else:
                 feedback = f"Good solution! Your approach addresses the key elements: {reference_step}"
                 
-        elif keyword_matches >= len(relevant_keywords) * 0.3:  # 30% keyword match threshold
-            status = SolutionStatus.NEEDS_REFINEMENT
+        elif status == SolutionStatus.NEEDS_REFINEMENT:
             if ai_flow and ai_flow.hints:
                 # Use AI flow hints for guidance
                 hint = self._get_random_suggestion(ai_flow.hints)
@@ -88,7 +248,6 @@ class ProblemManager:
             else:
                 feedback = f"Your solution is on the right track but could be more comprehensive. Consider: {reference_step}"
         else:
-            status = SolutionStatus.REJECTED
             if ai_flow and ai_flow.hints:
                 # Use AI flow hints for guidance
                 hint = self._get_random_suggestion(ai_flow.hints)
@@ -108,11 +267,7 @@ class ProblemManager:
     
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract meaningful keywords from reference text"""
-        # Simple keyword extraction - in production, use NLP libraries
-        stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by"}
-        words = text.lower().split()
-        keywords = [word for word in words if len(word) > 3 and word not in stop_words]
-        return keywords[:5]  # Top 5 keywords
+        return extract_keywords(text)
     
     def get_available_problems(self) -> List[ProblemFramework]:
         """Get list of available problems for admin selection"""
@@ -120,18 +275,8 @@ class ProblemManager:
     
     def get_active_problem_info(self) -> Optional[Dict]:
         """Get information about the currently active problem"""
-        if not self.current_problem:
-            return None
-        
-        return {
-            "id": self.current_problem.id,
-            "title": self.current_problem.title,
-            "description": self.current_problem.description,
-            "difficulty_level": self.current_problem.difficulty_level,
-            "category": self.current_problem.category,
-            "total_steps": self.current_problem.required_steps
-        }
+        return self.snapshot.info
     
     def get_ai_flow_config(self) -> Dict:
         """Get the global AI flow configuration"""
-        return AI_FLOW_CONFIG
+        return self.ai_flow_config
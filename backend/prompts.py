@@ -0,0 +1,112 @@
+"""
+Prompt construction for LLM-backed solution evaluation.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm.prompt import compile_prompt
+from schemas import ProblemFramework
+
+
+def _bullets(items: List[str]) -> str:
+    return "\n".join(f"• {item}" for item in items)
+
+
+def build_problem_prompt(problem: ProblemFramework, ai_flow_config: Dict[str, Any]) -> str:
+    """Render the active problem and its AI flow as a system prompt"""
+    steps = "\n".join(f"{i}. {step}" for i, step in enumerate(problem.reference_steps, start=1))
+    sections = [
+        "You evaluate a user's proposed solution step for the problem below.",
+        f"Problem: {problem.title}\n{problem.description}",
+        f"Difficulty: {problem.difficulty_level}\nCategory: {problem.category}",
+        f"Reference steps:\n{steps}",
+    ]
+    if problem.ai_flow:
+        sections.append(f"Evaluation criteria:\n{_bullets(problem.ai_flow.evaluation_criteria)}")
+        sections.append(f"Suggestions you may offer:\n{_bullets(problem.ai_flow.suggestions)}")
+        sections.append(f"Hints you may offer (never give away the full answer):\n{_bullets(problem.ai_flow.hints)}")
+    evaluation_prompts = ai_flow_config.get("evaluation_prompts", {})
+    if evaluation_prompts:
+        sections.append(f"Evaluation guidance:\n{_bullets(list(evaluation_prompts.values()))}")
+    sections.append(
+        "Identify which reference step the user is addressing, state whether it is "
+        "approved, needs refinement or is rejected, and give brief feedback."
+    )
+    return "\n\n".join(sections)
+
+
+def build_evaluation_context(
+    base_context: Dict[str, Any],
+    problem: ProblemFramework,
+    ai_flow_config: Dict[str, Any],
+    session_summary: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Combine the daily context (context.yaml) with the active problem into the
+    context format accepted by LLMBase.chat. Earlier turns of the user's
+    session are passed as a short summary instead of being resent in full.
+    """
+    roles = list(base_context.get("roles", []))
+    roles.append({"system": build_problem_prompt(problem, ai_flow_config)})
+    if session_summary:
+        roles.append({"system": _summary_prompt(session_summary)})
+    context = {**base_context, "roles": roles, "problem_id": problem.id}
+    context["prompt"] = compile_prompt(context)
+    return context
+
+
+def _summary_prompt(session_summary: str) -> str:
+    return f"Progress of this user so far:\n{session_summary}"
+
+
+class EvaluationContextCache:
+    """
+    Evaluation contexts per (context file digest, problem), built and compiled
+    once. The shared prefix is never rebuilt per request, so every user of a
+    problem sends the same leading bytes upstream, and a session summary only
+    extends it at the end.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[ProblemFramework, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        base_context: Dict[str, Any],
+        context_digest: str,
+        problem: ProblemFramework,
+        ai_flow_config: Dict[str, Any],
+        session_summary: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        key = (context_digest, problem.id)
+        entry = self._entries.get(key)
+        # A reloaded catalog brings new problem objects under the same id
+        if entry is not None and entry[0] is problem:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            context = entry[1]
+        else:
+            self.misses += 1
+            context = build_evaluation_context(base_context, problem, ai_flow_config)
+            self._entries[key] = (problem, context)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if not session_summary:
+            return context
+        summary = {"system": _summary_prompt(session_summary)}
+        return {
+            **context,
+            "roles": context["roles"] + [summary],
+            "prompt": context["prompt"].extend([{"role": "system", "content": summary["system"]}]),
+        }
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
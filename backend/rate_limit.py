@@ -0,0 +1,262 @@
+"""
+Token-bucket rate limiting per authenticated user and for the whole service.
+
+A bucket is just ``(tokens, updated_at)``: it is refilled lazily from the
+elapsed time whenever it is touched, so a check is O(1) and idle buckets cost
+nothing but their slot. A bucket idle long enough to be full again is
+indistinguishable from a new one, which is what makes evicting it safe.
+
+The in-process backend serves a single worker. The SQLite backend keeps the
+buckets in a WAL-mode database file so every uvicorn worker (or every pod on a
+shared volume) draws from the same buckets.
+"""
+
+import asyncio
+import logging
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = "*"
+
+
+def refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> float:
+    """Tokens in a bucket last left at ``tokens`` at time ``updated``"""
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+def take(tokens: float, cost: float, rate: float, burst: float) -> Tuple[float, float]:
+    """
+    Spend ``cost`` tokens: returns the tokens left and 0, or the tokens
+    unchanged and the seconds until ``cost`` tokens are available. A cost
+    above ``burst`` is allowed once the bucket is full and leaves it in debt,
+    so the requests after it wait until the whole cost has been refilled.
+    """
+    needed = min(cost, burst)
+    if tokens >= needed:
+        return tokens - cost, 0.0
+    return tokens, (needed - tokens) / rate
+
+
+class RateLimitBackend(ABC):
+    # Whether acquire may wait on I/O or locks held by other processes
+    blocking = False
+
+    def __init__(self, idle_seconds: float):
+        self.idle_seconds = idle_seconds
+        self.evicted = 0
+        self.errors = 0
+
+    @abstractmethod
+    def acquire(self, key: str, cost: float, rate: float, burst: float) -> float:
+        """
+        Take ``cost`` tokens from bucket ``key`` (a negative cost refunds them)
+        and return 0, or return how many seconds to wait if there are too few.
+        """
+
+    @abstractmethod
+    def size(self) -> int:
+        """Number of buckets currently stored"""
+
+    def close(self):
+        """Release the storage"""
+
+
+class InProcessRateLimitBackend(RateLimitBackend):
+    """
+    Buckets in an LRU-ordered dict. Buckets untouched for ``idle_seconds``
+    are evicted from the cold end as new requests arrive, and the oldest ones
+    go first once ``max_buckets`` is reached.
+    """
+
+    def __init__(self, idle_seconds: float = 600.0, max_buckets: int = 100_000):
+        super().__init__(idle_seconds)
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._evict(now)
+                bucket = self._buckets[key] = [burst, now]
+            else:
+                self._buckets.move_to_end(key)
+            tokens, wait = take(refill(bucket[0], bucket[1], now, rate, burst), cost, rate, burst)
+            bucket[0], bucket[1] = min(tokens, burst), now
+            return wait
+
+    def _evict(self, now: float):
+        # Ordered by last use, so only the cold end needs looking at
+        buckets = self._buckets
+        while buckets:
+            key, (_, updated) = next(iter(buckets.items()))
+            if now - updated < self.idle_seconds and len(buckets) < self.max_buckets:
+                break
+            del buckets[key]
+            self.evicted += 1
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Buckets shared between processes through a WAL-mode SQLite file. Each
+    check is one short write transaction; rows idle for ``idle_seconds`` are
+    deleted every ``sweep_every`` checks. A check that cannot get the write
+    lock within ``busy_timeout`` seconds fails open: the request is allowed
+    and the error counted and logged.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, idle_seconds: float = 600.0, sweep_every: int = 1000, busy_timeout: float = 0.25):
+        super().__init__(idle_seconds)
+        self.path = path
+        self.sweep_every = sweep_every
+        self._lock = threading.Lock()
+        self._checks = 0
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def acquire(self, key: str, cost: float, rate: float, burst: float) -> float:
+        # Wall-clock time: the buckets are shared with other processes
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                self.errors += 1
+                logger.warning("Rate limit store %s unavailable, allowing the request: %s", self.path, e)
+                return 0.0
+            try:
+                row = conn.execute("SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+                tokens = refill(row[0], row[1], now, rate, burst) if row else burst
+                tokens, wait = take(tokens, cost, rate, burst)
+                conn.execute(
+                    "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (key, min(tokens, burst), now),
+                )
+                self._checks += 1
+                if self._checks % self.sweep_every == 0:
+                    deleted = conn.execute(
+                        "DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - self.idle_seconds,)
+                    ).rowcount
+                    self.evicted += max(0, deleted)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_rate_limit_backend(kind: str, path: str, idle_seconds: float = 600.0, max_buckets: int = 100_000) -> RateLimitBackend:
+    if kind == "memory":
+        return InProcessRateLimitBackend(idle_seconds=idle_seconds, max_buckets=max_buckets)
+    if kind == "sqlite":
+        return SQLiteRateLimitBackend(path, idle_seconds=idle_seconds)
+    raise ValueError(f"Unknown rate limit backend {kind!r}, expected 'memory' or 'sqlite'")
+
+
+class RateLimiter:
+    """
+    Per-user buckets of ``user_burst`` tokens refilled at ``user_rate`` per
+    second, in front of one global bucket. A rate of 0 disables that bucket.
+    A request denied by the global bucket gets its user token back.
+    ``max_cost`` is the largest cost one check may charge (a full batch);
+    charges above a burst put the bucket in debt rather than being refused.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        user_rate: float = 1.0,
+        user_burst: float = 20.0,
+        global_rate: float = 0.0,
+        global_burst: float = 0.0,
+        max_cost: float = 1.0,
+    ):
+        self.backend = backend
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst or global_rate
+        self.allowed = 0
+        self.limited_user = 0
+        self.limited_global = 0
+        # Evicting a bucket before it has refilled, even from the deepest debt, would hand out free tokens
+        refill_seconds = max(
+            max(user_burst, max_cost) / user_rate if user_rate > 0 else 0.0,
+            max(self.global_burst, max_cost) / global_rate if global_rate > 0 else 0.0,
+        )
+        backend.idle_seconds = max(backend.idle_seconds, refill_seconds)
+
+    def check(self, user_id: str, cost: float = 1.0) -> Optional[float]:
+        """
+        Charge ``cost`` requests to ``user_id`` and return None, or the
+        seconds to wait before retrying if the user or the service is over its
+        limit. A cost above a burst waits for a full bucket and then
+        throttles the requests after it until it has been refilled.
+        """
+        if self.user_rate > 0:
+            wait = self.backend.acquire(f"user:{user_id}", cost, self.user_rate, self.user_burst)
+            if wait:
+                self.limited_user += 1
+                return wait
+        if self.global_rate > 0:
+            wait = self.backend.acquire(GLOBAL_KEY, cost, self.global_rate, self.global_burst)
+            if wait:
+                if self.user_rate > 0:
+                    self.backend.acquire(f"user:{user_id}", -cost, self.user_rate, self.user_burst)
+                self.limited_global += 1
+                return wait
+        self.allowed += 1
+        return None
+
+    async def check_async(self, user_id: str, cost: float = 1.0) -> Optional[float]:
+        """``check`` that keeps a blocking backend off the event loop"""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.check, user_id, cost)
+        return self.check(user_id, cost)
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "allowed": self.allowed,
+            "limited_user": self.limited_user,
+            "limited_global": self.limited_global,
+            "buckets": self.backend.size(),
+            "evicted": self.backend.evicted,
+            "errors": self.backend.errors,
+        }
+
+
+def retry_after_header(wait: float) -> str:
+    """Retry-After value in whole seconds, never 0"""
+    return str(max(1, math.ceil(wait)))
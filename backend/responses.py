@@ -0,0 +1,55 @@
+"""
+JSON responses serialized with orjson and served compressed when the client accepts it.
+"""
+
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from compression import CompressionPolicy, encoded_etag
+from snapshot import JSONBody, dump_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered by ``dump_json``. Returning one from an endpoint
+    also skips FastAPI's ``jsonable_encoder`` pass, so content must already be
+    plain JSON types (dicts, lists, strings, numbers, booleans and None).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Any representation of the body matches: gzip and identity bytes carry the same content
+    prefix = etag[:-1] + "-"
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if tag == "*" or tag == etag or tag.startswith(prefix):
+            return True
+    return False
+
+
+def json_body_response(request: Request, body: JSONBody, compression: Optional[CompressionPolicy] = None) -> Response:
+    """
+    Serve a pre-serialized JSON body, answering 304 when the client's ETag
+    still matches. With a ``compression`` policy the body is compressed in
+    the client's preferred encoding once and the bytes kept on ``body``.
+    """
+    encoding = None
+    if compression is not None and len(body.body) >= compression.minimum_size:
+        encoding = compression.negotiate(request.headers.get("accept-encoding", ""))
+    etag = encoded_etag(body.etag, encoding) if encoding else body.etag
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"} if compression is not None else {"ETag": etag}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, body.etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(content=body.body, media_type="application/json", headers=headers)
+    content = body.encoded.get(encoding)
+    if content is None:
+        content = body.encoded[encoding] = compression.compress(body.body, encoding)
+    headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -40,6 +40,25 @@ class ChatResponse(BaseModel):
     response: str = Field(..., description="Assistant's evaluation and feedback")
     out_of_scope: Optional[bool] = Field(False, description="True if the user input was out of context")
     solution_evaluated: bool = Field(False, description="Whether the input was evaluated as a solution")
+    matched_step: Optional[int] = Field(None, description="1-based number of the reference step that best matches the input")
+    step_statuses: Optional[List[SolutionStatus]] = Field(None, description="Evaluation status of the input against each reference step")
+    completed_steps: Optional[List[int]] = Field(None, description="1-based numbers of the reference steps the user has completed in this session")
+
+class BatchChatItem(BaseModel):
+    user_input: str = Field(..., description="Submission to evaluate")
+    problem_id: Optional[str] = Field(None, description="Problem to evaluate against; defaults to the batch problem_id")
+    id: Optional[str] = Field(None, description="Caller-defined identifier echoed back with the result")
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem] = Field(..., description="Submissions to evaluate")
+    problem_id: Optional[str] = Field(None, description="Default problem for items without one; defaults to the active problem")
+
+class BatchChatResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[str] = Field(None, description="Identifier given with the item")
+    problem_id: Optional[str] = Field(None, description="Problem the item was evaluated against")
+    result: Optional[ChatResponse] = Field(None, description="Evaluation of the item")
+    error: Optional[str] = Field(None, description="Why the item could not be evaluated")
 
 class ProblemRequest(BaseModel):
     problem_id: str = Field(..., description="ID of the problem to set as active")
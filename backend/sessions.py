@@ -0,0 +1,166 @@
+"""
+Bounded in-memory store of each user's recent solution steps.
+
+Sessions are keyed by the JWT ``sub`` and hold the last few submissions for
+the active problem, plus a bitmask of the reference steps already approved.
+Records use ``__slots__`` and keep only what is needed to summarize progress.
+Idle sessions are evicted in LRU order, and a per-user step cap and a total
+byte ceiling bound memory use.
+"""
+
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+from schemas import SolutionStatus, SolutionStep
+
+# Rough per-record and per-session overhead used for the memory ceiling
+_RECORD_OVERHEAD = 120
+_SESSION_OVERHEAD = 400
+
+
+class StepRecord:
+    __slots__ = ("id", "step_number", "status", "timestamp", "user_input")
+
+    def __init__(self, step_number: int, status: SolutionStatus, timestamp: float, user_input: str):
+        # Assigned once so /session reports the same id for a step on every request
+        self.id = uuid.uuid4().hex
+        self.step_number = step_number
+        self.status = status
+        self.timestamp = timestamp
+        self.user_input = user_input
+
+    def size(self) -> int:
+        return _RECORD_OVERHEAD + len(self.id) + len(self.user_input)
+
+
+class UserSession:
+    __slots__ = ("user_id", "problem_id", "steps", "approved_mask", "size", "last_seen")
+
+    def __init__(self, user_id: str, problem_id: str, max_steps: int):
+        self.user_id = user_id
+        self.problem_id = problem_id
+        self.steps: Deque[StepRecord] = deque(maxlen=max_steps)
+        self.approved_mask = 0
+        self.size = _SESSION_OVERHEAD + len(user_id)
+        self.last_seen = time.monotonic()
+
+    def approved_steps(self) -> List[int]:
+        """1-based numbers of the reference steps approved so far"""
+        mask, steps, number = self.approved_mask, [], 1
+        while mask:
+            if mask & 1:
+                steps.append(number)
+            mask >>= 1
+            number += 1
+        return steps
+
+    def summary(self, max_input_chars: int = 80) -> str:
+        """Short description of earlier turns for the LLM prompt"""
+        lines = []
+        for record in self.steps:
+            text = record.user_input if len(record.user_input) <= max_input_chars else record.user_input[:max_input_chars] + "…"
+            step = f"step {record.step_number}" if record.step_number else "unscored"
+            lines.append(f"- {step}, {record.status.value}: {text}")
+        approved = ", ".join(str(step) for step in self.approved_steps()) or "none"
+        return f"Reference steps already approved: {approved}\nEarlier submissions:\n" + "\n".join(lines)
+
+
+class SessionStore:
+    def __init__(
+        self,
+        max_steps_per_user: int = 20,
+        max_sessions: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        idle_seconds: float = 3600.0,
+    ):
+        self.max_steps_per_user = max_steps_per_user
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, UserSession]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def get(self, user_id: str, problem_id: str) -> Optional[UserSession]:
+        """Return the user's session for ``problem_id``; sessions for another problem are stale"""
+        session = self._sessions.get(user_id)
+        if session is None or session.problem_id != problem_id:
+            return None
+        if time.monotonic() - session.last_seen > self.idle_seconds:
+            self._drop(user_id)
+            return None
+        return session
+
+    def record(
+        self,
+        user_id: str,
+        problem_id: str,
+        user_input: str,
+        status: SolutionStatus,
+        step_number: Optional[int] = None,
+    ) -> UserSession:
+        session = self._sessions.get(user_id)
+        if session is not None and session.problem_id != problem_id:
+            self._drop(user_id)
+            session = None
+        if session is None:
+            session = UserSession(user_id, problem_id, self.max_steps_per_user)
+            self._sessions[user_id] = session
+            self._bytes += session.size
+
+        if len(session.steps) == session.steps.maxlen:
+            oldest = session.steps[0]
+            session.size -= oldest.size()
+            self._bytes -= oldest.size()
+        record = StepRecord(step_number or 0, status, time.time(), user_input)
+        session.steps.append(record)
+        session.size += record.size()
+        self._bytes += record.size()
+        if status == SolutionStatus.APPROVED and step_number:
+            session.approved_mask |= 1 << (step_number - 1)
+        session.last_seen = time.monotonic()
+        self._sessions.move_to_end(user_id)
+        self._evict()
+        return session
+
+    def history(self, user_id: str, problem_id: str) -> List[SolutionStep]:
+        """The user's recorded steps for ``problem_id``, oldest first"""
+        session = self.get(user_id, problem_id)
+        if session is None:
+            return []
+        return [
+            SolutionStep(
+                id=record.id,
+                user_input=record.user_input,
+                proposed_solution=record.user_input,
+                status=record.status,
+                timestamp=datetime.fromtimestamp(record.timestamp, tz=timezone.utc),
+                step_number=record.step_number,
+            )
+            for record in session.steps
+        ]
+
+    def _drop(self, user_id: str):
+        session = self._sessions.pop(user_id)
+        self._bytes -= session.size
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            over_capacity = len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            if not over_capacity and now - session.last_seen <= self.idle_seconds:
+                break
+            self._drop(user_id)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,89 @@
+"""
+Immutable snapshot of the active problem and its pre-serialized responses.
+
+ProblemManager publishes a new snapshot by swapping a single reference, so a
+request that reads the snapshot once sees a consistent problem, index and
+set of response bodies even if an admin switches problems concurrently.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from keyword_index import ProblemIndex
+from schemas import ProblemFramework
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def dump_json(content: Any) -> bytes:
+    """Serialize compactly as UTF-8 JSON, like FastAPI's JSONResponse but with orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+@dataclass(frozen=True)
+class JSONBody:
+    """A pre-serialized JSON response body with its strong ETag"""
+    body: bytes
+    etag: str
+    # Compressed representations by content coding, filled on first request for each
+    encoded: Dict[str, bytes] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def of(cls, content: Any) -> "JSONBody":
+        body = dump_json(content)
+        return cls(body=body, etag=make_etag(body))
+
+
+@dataclass(frozen=True)
+class ActiveProblemSnapshot:
+    version: int
+    problem: Optional[ProblemFramework]
+    index: Optional[ProblemIndex]
+    info: Optional[Dict[str, Any]]
+    current_problem: Optional[JSONBody]
+    ai_flow_config: Optional[JSONBody]
+
+
+def problem_info(problem: ProblemFramework) -> Dict[str, Any]:
+    return {
+        "id": problem.id,
+        "title": problem.title,
+        "description": problem.description,
+        "difficulty_level": problem.difficulty_level,
+        "category": problem.category,
+        "total_steps": problem.required_steps
+    }
+
+
+def build_snapshot(
+    version: int,
+    problem: Optional[ProblemFramework],
+    index: Optional[ProblemIndex],
+    ai_flow_config: Dict[str, Any],
+) -> ActiveProblemSnapshot:
+    if problem is None:
+        return ActiveProblemSnapshot(version, None, None, None, None, None)
+    info = problem_info(problem)
+    ai_flow = JSONBody.of({
+        "global_config": ai_flow_config,
+        "problem_specific": problem.ai_flow.dict() if problem.ai_flow else None
+    })
+    return ActiveProblemSnapshot(
+        version=version,
+        problem=problem,
+        index=index,
+        info=info,
+        current_problem=JSONBody.of(info),
+        ai_flow_config=ai_flow,
+    )
@@ -0,0 +1,144 @@
+"""
+Pluggable storage for the globally active problem.
+
+The in-process backend keeps the active problem id in memory, which is all a
+single worker needs. The SQLite backend shares it through a WAL-mode database
+file so every uvicorn worker (or every pod on a shared volume) follows
+/admin/set-problem. Changes are detected by a background watcher thread that
+checks ``PRAGMA data_version``, so requests never touch the store.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[str], None]
+
+
+class StateBackend(ABC):
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @abstractmethod
+    def get_active_problem_id(self) -> Optional[str]:
+        """Return the stored active problem id, or None if none was stored yet"""
+
+    @abstractmethod
+    def set_active_problem_id(self, problem_id: str):
+        """Store the active problem id and notify every subscriber"""
+
+    def subscribe(self, subscriber: Subscriber):
+        """Register a callback invoked with the new problem id on every change"""
+        self._subscribers.append(subscriber)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Begin watching for changes; notifications are delivered on ``loop`` if given"""
+        self._loop = loop
+
+    def close(self):
+        """Stop watching for changes"""
+
+    def _notify(self, problem_id: str):
+        for subscriber in self._subscribers:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(subscriber, problem_id)
+            else:
+                subscriber(problem_id)
+
+
+class InProcessStateBackend(StateBackend):
+    def __init__(self):
+        super().__init__()
+        self._problem_id: Optional[str] = None
+
+    def get_active_problem_id(self) -> Optional[str]:
+        return self._problem_id
+
+    def set_active_problem_id(self, problem_id: str):
+        self._problem_id = problem_id
+        # Writers apply their own changes; nothing else shares this process state
+
+
+class SQLiteStateBackend(StateBackend):
+    def __init__(self, path: str, poll_interval: float = 0.05):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS active_problem "
+            "(id INTEGER PRIMARY KEY CHECK (id = 1), problem_id TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get_active_problem_id(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT problem_id FROM active_problem WHERE id = 1").fetchone()
+        return row[0] if row else None
+
+    def set_active_problem_id(self, problem_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO active_problem (id, problem_id, updated_at) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET problem_id = excluded.problem_id, updated_at = excluded.updated_at",
+                (problem_id, time.time()),
+            )
+            self._conn.commit()
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        super().start(loop)
+        if self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="problem-state-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        # A dedicated connection: data_version only changes for commits made by other connections
+        conn = self._connect()
+        try:
+            last_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            while not self._stop.wait(self.poll_interval):
+                try:
+                    version = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if version == last_version:
+                        continue
+                    last_version = version
+                    row = conn.execute("SELECT problem_id FROM active_problem WHERE id = 1").fetchone()
+                    if row:
+                        self._notify(row[0])
+                except sqlite3.Error as e:
+                    logger.warning("Problem state watcher failed to read %s: %s", self.path, e)
+        finally:
+            conn.close()
+
+    def close(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=1.0)
+            self._watcher = None
+        with self._lock:
+            self._conn.close()
+
+
+def create_state_backend(kind: str, path: str, poll_interval: float = 0.05) -> StateBackend:
+    if kind == "memory":
+        return InProcessStateBackend()
+    if kind == "sqlite":
+        return SQLiteStateBackend(path, poll_interval=poll_interval)
+    raise ValueError(f"Unknown problem state backend {kind!r}, expected 'memory' or 'sqlite'")
@@ -0,0 +1,66 @@
+"""
+Helpers for streaming chat responses as plain text or server-sent events.
+"""
+
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+EVENT_STREAM = "text/event-stream"
+
+
+def wants_event_stream(request: Request) -> bool:
+    """True when the client asked for server-sent events"""
+    return EVENT_STREAM in request.headers.get("accept", "")
+
+
+def format_sse(data: str, event: Optional[str] = None) -> str:
+    """Encode one server-sent event frame; multi-line data becomes several data fields"""
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+async def _sse_frames(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    try:
+        async for chunk in chunks:
+            if chunk:
+                yield format_sse(chunk)
+    except Exception as e:
+        yield format_sse(str(e), event="error")
+        return
+    yield format_sse("[DONE]", event="done")
+
+
+async def _text_chunks(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception as e:
+        yield f"[ERROR] {str(e)}"
+
+
+def stream_chunks(chunks: AsyncIterator[str], event_stream: bool) -> StreamingResponse:
+    """
+    Stream text chunks to the client as they are produced, either as
+    text/event-stream frames or as raw text/plain for simple clients.
+    """
+    if event_stream:
+        return StreamingResponse(
+            _sse_frames(chunks),
+            media_type=EVENT_STREAM,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return StreamingResponse(_text_chunks(chunks), media_type="text/plain")
+
+
+async def single_chunk(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def prepend_chunk(first: str, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Re-attach a chunk that was read ahead of the rest of the stream"""
+    yield first
+    async for chunk in chunks:
+        yield chunk
@@ -0,0 +1,159 @@
+"""
+Append-only JSONL log of evaluated submissions, written in batches.
+
+The request path only appends a record to an in-memory deque. A background
+task flushes the queue when it reaches ``batch_size`` records or every
+``flush_interval`` seconds, serializing and writing on a worker thread.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+
+class SubmissionRecorder:
+    """
+    Batched writer for submission records.
+
+    fsync policies: ``never`` leaves durability to the OS, ``batch`` fsyncs
+    after every flushed batch and ``interval`` fsyncs written data once it is
+    ``fsync_interval`` seconds old, from the background task's timer whether
+    or not more records arrive. Both also fsync after the final drain. The log rotates to ``path.1`` ... ``path.N``
+    once it grows past ``max_bytes``. Records beyond ``max_queue`` are dropped
+    (and counted) rather than growing memory without bound.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        fsync: str = "interval",
+        fsync_interval: float = 5.0,
+        max_bytes: int = 100 * 1024 * 1024,
+        backup_count: int = 5,
+        max_queue: int = 100000,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}, expected one of {FSYNC_POLICIES}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_queue = max_queue
+
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    def record(self, **fields: Any):
+        """Queue one submission record; O(1) and never blocks on I/O"""
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        fields.setdefault("ts", time.time())
+        self._queue.append(fields)
+        if len(self._queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def aclose(self):
+        """Stop the background task and drain everything still queued"""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self.fsync != "never":
+            await asyncio.to_thread(self._sync)
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                if self.fsync == "interval" and self._unsynced and time.monotonic() - self._last_fsync >= self.fsync_interval:
+                    await asyncio.to_thread(self._sync)
+            except Exception as e:
+                logger.warning("Failed to write submission log %s: %s", self.path, e)
+
+    async def flush(self):
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        data = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in batch)
+        self._rotate_if_needed()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            self._unsynced = True
+            if self.fsync == "batch" or (self.fsync == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval):
+                self._fsync(f)
+        self.written += len(batch)
+        self.flushes += 1
+
+    def _fsync(self, f):
+        os.fsync(f.fileno())
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+
+    def _sync(self):
+        """fsync records written since the last fsync"""
+        if not self._unsynced:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            self._fsync(f)
+
+    def _rotate_if_needed(self):
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except FileNotFoundError:
+            return
+        if self.fsync != "never":
+            # The rotated file is never appended to again, so nothing would sync it later
+            self._sync()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+        }
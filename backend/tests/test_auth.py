@@ -0,0 +1,46 @@
+import asyncio
+
+import httpx
+
+from auth import JWKSProvider
+from benchmarks.keys import LocalSigner
+
+
+def provider_for(jwks):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=jwks())
+
+    provider = JWKSProvider("http://auth.test/certs", max_unknown_kids=4)
+    provider._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return provider, requests
+
+
+def test_junk_kids_do_not_hold_back_a_rotated_key():
+    old, new = LocalSigner("old"), LocalSigner("new")
+    published = [old.public_jwk]
+    provider, requests = provider_for(lambda: {"keys": published})
+
+    async def lookups():
+        assert await provider.get_key("old") is not None
+        assert await provider.get_key("junk") is None
+        assert await provider.get_key("junk") is None
+        published.append(new.public_jwk)
+        return await provider.get_key("new")
+
+    assert asyncio.run(lookups()) is not None
+    assert len(requests) == 3
+
+
+def test_distinct_junk_kids_cannot_cause_a_fetch_storm():
+    provider, requests = provider_for(lambda: {"keys": [LocalSigner("real").public_jwk]})
+
+    async def lookups():
+        await provider.get_key("real")
+        for i in range(100):
+            assert await provider.get_key(f"junk-{i}") is None
+
+    asyncio.run(lookups())
+    assert len(requests) == 1 + provider.max_unknown_kids
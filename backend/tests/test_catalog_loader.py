@@ -0,0 +1,43 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from catalog_loader import CatalogWatcher
+from problems_config import ALL_PROBLEMS
+
+
+def test_watcher_ignores_other_files_next_to_the_context_file(tmp_path):
+    # Without notifications the watcher polls, which scans on every interval by design
+    pytest.importorskip("watchfiles")
+    problems_dir = tmp_path / "problems"
+    problems_dir.mkdir()
+    context_path = tmp_path / "context.yaml"
+    context_path.write_text("roles: []\n")
+    changes = []
+    watcher = CatalogWatcher(str(problems_dir), changes.append, context_path=str(context_path), poll_interval=0.05)
+    scans = []
+    scan = watcher.scan
+    watcher.scan = lambda: scans.append(time.monotonic()) or scan()
+
+    async def write_files():
+        watcher.start(asyncio.get_running_loop())
+        await asyncio.sleep(0.3)
+        for name in ("submissions.jsonl", "rate_limits.db", "rate_limits.db-wal", "server.log"):
+            (tmp_path / name).write_text("traffic\n")
+        (problems_dir / "notes.txt").write_text("not a problem\n")
+        await asyncio.sleep(0.5)
+        ignored_scans = len(scans)
+        (problems_dir / "extra.json").write_text(json.dumps(ALL_PROBLEMS[0].model_dump() | {"id": "extra"}))
+        deadline = time.monotonic() + 5
+        while not changes and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return ignored_scans
+
+    try:
+        ignored_scans = asyncio.run(write_files())
+    finally:
+        watcher.close()
+    assert ignored_scans == 0
+    assert changes and "extra" in changes[0].upserts
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from llm.base import LLMBase
+from llm.errors import LLMUnavailableError
+from llm.guard import GuardedLLM
+
+
+class TickingLLM(LLMBase):
+    """Yields a token every ``interval`` seconds"""
+
+    def __init__(self, interval: float, tokens: int = 10):
+        self.interval = interval
+        self.tokens = tokens
+
+    async def chat(self, context, user_input, temperature=0.3, max_tokens=512, stream=False):
+        for i in range(self.tokens):
+            await asyncio.sleep(self.interval)
+            yield f"t{i}"
+
+
+def test_deadline_stops_a_slow_stream_without_cancelling_the_caller():
+    llm = GuardedLLM(TickingLLM(0.05), default_deadline=0.12)
+
+    async def consume():
+        received = []
+        with pytest.raises(LLMUnavailableError, match="deadline"):
+            async for chunk in llm.chat({}, "x", stream=True):
+                received.append(chunk)
+        # The deadline's cancellation was consumed by the guard, not left pending on the task
+        assert asyncio.current_task().cancelling() == 0
+        await asyncio.sleep(0)
+        return received
+
+    assert asyncio.run(consume()) == ["t0", "t1"]
+    assert llm.deadline_exceeded == 1
+
+
+def test_deadline_never_cancels_the_consumer_holding_a_chunk():
+    llm = GuardedLLM(TickingLLM(0.01), default_deadline=0.05)
+
+    async def consume():
+        received = []
+        with pytest.raises(LLMUnavailableError, match="deadline"):
+            async for chunk in llm.chat({}, "x", stream=True):
+                received.append(chunk)
+                # Outlives the deadline; must not be cancelled
+                await asyncio.sleep(0.1)
+        return received
+
+    assert asyncio.run(consume()) == ["t0"]
+
+
+def test_outside_cancellation_is_not_turned_into_a_deadline():
+    llm = GuardedLLM(TickingLLM(0.05), default_deadline=0.2)
+
+    async def consume():
+        async for _ in llm.chat({}, "x", stream=True):
+            pass
+
+    async def cancel_midway():
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.07)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+    assert llm.deadline_exceeded == 0
@@ -0,0 +1,41 @@
+from keyword_index import ProblemIndex
+from schemas import ProblemFramework, SolutionStatus
+
+PROBLEM = ProblemFramework(
+    id="math_sequence",
+    title="Mathematical Sequence Problem",
+    description="Find the next number in the sequence",
+    reference_steps=[
+        "Identify the pattern in the sequence",
+        "Recognize it's a geometric sequence",
+        "Calculate the common ratio",
+        "Apply the pattern to find the next term",
+        "Verify the solution fits the pattern",
+    ],
+    required_steps=5,
+    difficulty_level="beginner",
+    category="math",
+)
+STEP_1_DONE = 0b1
+
+
+def test_completed_step_that_matches_beats_uncompleted_step_that_would_fail():
+    # "pattern" covers 1/3 of step 1 but only 1/4 of step 5, below the refinement threshold
+    scores = ProblemIndex(PROBLEM).score("pattern doubling", STEP_1_DONE)
+    assert scores.best_step == 0
+    assert scores.statuses[0] == SolutionStatus.NEEDS_REFINEMENT
+
+
+def test_completed_step_yields_to_uncompleted_step_that_matches():
+    # Step 1 is fully covered, but step 4 reaches the refinement threshold (2 of 5 keywords)
+    index = ProblemIndex(PROBLEM)
+    assert index.score("identify the pattern in the sequence and apply it").best_step == 0
+    assert index.score("identify the pattern in the sequence and apply it", STEP_1_DONE).best_step == 3
+
+
+def test_score_many_ranks_like_score():
+    index = ProblemIndex(PROBLEM)
+    inputs = ["pattern doubling", "identify the pattern in the sequence and apply it", "identify the pattern"]
+    masks = [STEP_1_DONE, STEP_1_DONE, 0]
+    batch = index.score_many(inputs, masks)
+    assert [scores.best_step for scores in batch] == [index.score(text, mask).best_step for text, mask in zip(inputs, masks)]
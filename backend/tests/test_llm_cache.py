@@ -0,0 +1,62 @@
+import asyncio
+
+from config import get_context, get_context_digest
+from llm.base import LLMBase
+from llm.cache import CachedLLM, ResponseCache
+from llm.coalesce import CoalescingLLM
+from problems_config import AI_FLOW_CONFIG, ALL_PROBLEMS
+from prompts import EvaluationContextCache
+
+SUBMISSION = "Identify the pattern in the sequence"
+
+
+class EchoLLM(LLMBase):
+    """Answers with the system messages it was sent, after yielding control once"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def chat(self, context, user_input, temperature=0.3, max_tokens=512, stream=False):
+        self.calls += 1
+        await asyncio.sleep(0)
+        yield " | ".join(message["content"] for message in context["prompt"].messages if message["role"] == "system")
+
+
+def session_contexts():
+    contexts = EvaluationContextCache()
+    problem = ALL_PROBLEMS[0]
+    first = contexts.get(get_context(), get_context_digest(), problem, AI_FLOW_CONFIG, "Reference steps already approved: 1")
+    second = contexts.get(get_context(), get_context_digest(), problem, AI_FLOW_CONFIG, "Reference steps already approved: none")
+    return first, second
+
+
+async def answer(llm: LLMBase, context) -> str:
+    return "".join([chunk async for chunk in llm.chat(context, SUBMISSION)])
+
+
+def test_sessions_with_different_summaries_do_not_share_cached_answers():
+    first, second = session_contexts()
+    upstream = EchoLLM()
+    llm = CachedLLM(upstream, ResponseCache())
+
+    async def ask():
+        return await answer(llm, first), await answer(llm, second), await answer(llm, first)
+
+    first_answer, second_answer, repeated = asyncio.run(ask())
+    assert upstream.calls == 2
+    assert "approved: 1" in first_answer and "approved: none" in second_answer
+    assert repeated == first_answer
+
+
+def test_sessions_with_different_summaries_are_not_coalesced():
+    first, second = session_contexts()
+    upstream = EchoLLM()
+    llm = CoalescingLLM(upstream)
+
+    async def ask():
+        return await asyncio.gather(answer(llm, first), answer(llm, second), answer(llm, first))
+
+    first_answer, second_answer, joined = asyncio.run(ask())
+    assert upstream.calls == 2 and llm.coalesced == 1
+    assert "approved: 1" in first_answer and "approved: none" in second_answer
+    assert joined == first_answer
@@ -0,0 +1,49 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from rate_limit import InProcessRateLimitBackend, RateLimiter
+
+# Before main reads its settings: nothing written to the working directory, no network at startup
+os.environ.update(SUBMISSION_LOG_ENABLED="0", JWKS_PREFETCH="0", EVALUATION_MODE="keyword")
+
+
+def test_batch_above_burst_is_allowed_and_throttles_later_requests():
+    limiter = RateLimiter(InProcessRateLimitBackend(), user_rate=1.0, user_burst=20.0, max_cost=500)
+    assert limiter.check("teacher", 30) is None
+    # The batch left the bucket 10 tokens in debt: one more request waits for 11 tokens
+    assert limiter.check("teacher") == pytest.approx(11.0, abs=0.01)
+    assert limiter.check("student") is None
+
+
+def test_batch_above_burst_waits_for_a_full_bucket():
+    limiter = RateLimiter(InProcessRateLimitBackend(), user_rate=1.0, user_burst=20.0, max_cost=500)
+    assert limiter.check("teacher", 15) is None
+    assert limiter.check("teacher", 30) == pytest.approx(15.0, abs=0.01)
+
+
+def test_batch_larger_than_user_burst_is_evaluated():
+    import main
+
+    burst = int(main.rate_limiter.user_burst)
+    main.app.dependency_overrides[main.require_auth] = lambda: {"sub": "teacher"}
+
+    async def post_batches():
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                items = [{"user_input": f"identify the pattern {i}"} for i in range(burst + 10)]
+                first = await client.post("/chat/batch", json={"items": items})
+                second = await client.post("/chat/batch", json={"items": items[:1]})
+                return first, second
+
+    try:
+        first, second = asyncio.run(post_batches())
+    finally:
+        main.app.dependency_overrides.clear()
+    assert first.status_code == 200
+    assert len(first.text.splitlines()) == burst + 10
+    assert second.status_code == 429
+    assert int(second.headers["retry-after"]) == 11
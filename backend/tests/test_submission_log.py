@@ -0,0 +1,45 @@
+import asyncio
+import json
+import os
+
+from submission_log import SubmissionRecorder
+
+
+def count_fsyncs(monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (calls.append(fd), real_fsync(fd)))
+    return calls
+
+
+def test_interval_fsync_runs_without_further_writes(tmp_path, monkeypatch):
+    fsyncs = count_fsyncs(monkeypatch)
+    recorder = SubmissionRecorder(str(tmp_path / "submissions.jsonl"), flush_interval=0.01, fsync_interval=0.05)
+
+    async def record_once():
+        await recorder.start()
+        recorder.record(user_id="u1", status="pending")
+        await asyncio.sleep(0.2)
+        synced = len(fsyncs)
+        await recorder.aclose()
+        return synced
+
+    assert asyncio.run(record_once()) == 1
+    # Nothing was written after the timer's fsync, so shutdown has nothing left to sync
+    assert len(fsyncs) == 1
+
+
+def test_final_drain_is_fsynced(tmp_path, monkeypatch):
+    fsyncs = count_fsyncs(monkeypatch)
+    path = tmp_path / "submissions.jsonl"
+    recorder = SubmissionRecorder(str(path), flush_interval=60, fsync_interval=60)
+
+    async def record_and_close():
+        await recorder.start()
+        for i in range(3):
+            recorder.record(user_id=f"u{i}", status="pending")
+        await recorder.aclose()
+
+    asyncio.run(record_and_close())
+    assert len(fsyncs) == 1
+    assert [json.loads(line)["user_id"] for line in path.read_text().splitlines()] == ["u0", "u1", "u2"]
@@ -0,0 +1,136 @@
+"""
+Deferred initialization run from the FastAPI lifespan hook.
+
+Expensive startup work (loading and indexing the problem catalog, reading
+the context file, opening upstream clients) is registered as named steps
+instead of running at import time. In ``blocking`` mode the lifespan hook
+awaits every step before uvicorn accepts connections; in ``background`` mode
+the server starts listening at once, ``/ready`` answers 503 until the steps
+finish, and other requests wait for them.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+STARTUP_MODES = ("blocking", "background")
+
+Step = Callable[[], Union[None, Awaitable[None]]]
+
+
+class Warmup:
+    """
+    Ordered startup steps. Plain functions run on a worker thread so they do
+    not stall the event loop (background mode keeps serving /health and
+    /ready meanwhile); coroutine functions are awaited on the loop.
+    """
+
+    def __init__(self, mode: str = "blocking"):
+        if mode not in STARTUP_MODES:
+            raise ValueError(f"Unknown startup mode {mode!r}, expected one of {STARTUP_MODES}")
+        self.mode = mode
+        self._steps: List[Tuple[str, Step]] = []
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.durations: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._created = time.perf_counter()
+        self.ready_after: Optional[float] = None
+
+    def add_step(self, name: str, step: Step):
+        """Register ``step`` to run after the steps added before it"""
+        self._steps.append((name, step))
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    async def run(self):
+        """Run every step once, in order; the first failure stops the warmup"""
+        for name, step in self._steps:
+            started = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(step):
+                    await step()
+                else:
+                    await asyncio.to_thread(step)
+            except Exception as e:
+                self.error = f"{name}: {e}"
+                raise
+            finally:
+                self.durations[name] = time.perf_counter() - started
+        self.ready_after = time.perf_counter() - self._created
+        self._ready.set()
+
+    async def start(self):
+        """Run the steps now (blocking mode) or on a background task (background mode)"""
+        if self.mode == "blocking":
+            await self.run()
+            return
+        self._task = asyncio.create_task(self._run_in_background())
+
+    async def _run_in_background(self):
+        try:
+            await self.run()
+        except Exception:
+            logger.exception("Startup warmup failed; the service stays not ready")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for the warmup and return whether it finished"""
+        if self.ready:
+            return True
+        if self.error is not None:
+            return False
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "mode": self.mode,
+            "error": self.error,
+            "ready_after_ms": round(self.ready_after * 1000, 3) if self.ready_after is not None else None,
+            "steps_ms": {name: round(seconds * 1000, 3) for name, seconds in self.durations.items()},
+        }
+
+
+class WarmupMiddleware:
+    """
+    Holds requests until the warmup has finished, answering 503 with
+    Retry-After if it takes longer than ``timeout`` seconds or failed. Paths
+    in ``exempt`` (health and readiness probes) are always served at once.
+    """
+
+    def __init__(self, app, warmup: Warmup, exempt: Tuple[str, ...] = (), timeout: float = 30.0):
+        self.app = app
+        self.warmup = warmup
+        self.exempt = frozenset(exempt)
+        self.timeout = timeout
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or self.warmup.ready
+            or scope["path"] in self.exempt
+            or await self.warmup.wait(self.timeout)
+        ):
+            await self.app(scope, receive, send)
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+        })
+        await send({"type": "http.response.body", "body": b'{"detail":"Service is starting up"}'})